@@ -16,11 +16,16 @@ Amazon Translate を使用した翻訳サンプル
 """
 
 import os
+import sys
 from pathlib import Path
 
 import boto3
 from dotenv import load_dotenv
 
+# リポジトリ直下の shared パッケージを読み込めるようにする
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from shared.instrumentation import instrument_boto3
+
 # .envファイルを明示的に指定して読み込み
 env_path = Path(__file__).parent / '.env'
 load_dotenv(dotenv_path=env_path)
@@ -54,6 +59,7 @@ def translate_text(text, source_lang, target_lang):
         aws_secret_access_key=aws_secret_access_key,
         region_name=AWS_DEFAULT_REGION
     )
+    instrument_boto3(translate)
 
     try:
         response = translate.translate_text(
@@ -83,6 +89,7 @@ def detect_language(text):
             aws_secret_access_key=aws_secret_access_key,
             region_name=AWS_DEFAULT_REGION
         )
+        instrument_boto3(comprehend)
         response = comprehend.detect_dominant_language(Text=text)
         return response['Languages'][0]['LanguageCode']
     except Exception as e:
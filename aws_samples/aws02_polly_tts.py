@@ -16,11 +16,16 @@ Amazon Polly を使用したテキスト読み上げサンプル
 """
 
 import os
+import sys
 from pathlib import Path
 
 import boto3
 from dotenv import load_dotenv
 
+# リポジトリ直下の shared パッケージを読み込めるようにする
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from shared.instrumentation import instrument_boto3
+
 # .envファイルを明示的に指定して読み込み
 env_path = Path(__file__).parent / '.env'
 load_dotenv(dotenv_path=env_path)
@@ -44,6 +49,7 @@ polly = boto3.client(
     aws_secret_access_key=aws_secret_access_key,
     region_name=AWS_DEFAULT_REGION
 )
+instrument_boto3(polly)
 
 
 def text_to_speech(text, output_file='speech.mp3', voice_id='Mizuki', engine='standard'):
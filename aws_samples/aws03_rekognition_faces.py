@@ -33,12 +33,17 @@ data/faces.png : 複数人の顔が写った写真
 
 import json
 import os
+import sys
 from pathlib import Path
 
 import boto3
 from botocore.exceptions import ClientError
 from dotenv import load_dotenv
 
+# リポジトリ直下の shared パッケージを読み込めるようにする
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from shared.instrumentation import instrument_boto3
+
 # .envファイルを明示的に指定して読み込み
 env_path = Path(__file__).parent / '.env'
 load_dotenv(dotenv_path=env_path)
@@ -66,6 +71,7 @@ rekognition = boto3.client(
     aws_secret_access_key=aws_secret_access_key,
     region_name=AWS_DEFAULT_REGION
 )
+instrument_boto3(rekognition)
 
 
 def detect_faces(image_path):
@@ -20,12 +20,17 @@ Amazon Comprehend を使用した感情分析、キーフレーズ抽出、エ
 
 import json
 import os
+import sys
 from pathlib import Path
 
 import boto3
 from botocore.exceptions import ClientError  # エラーハンドリングのために追加
 from dotenv import load_dotenv
 
+# リポジトリ直下の shared パッケージを読み込めるようにする
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from shared.instrumentation import instrument_boto3
+
 # .envファイルを明示的に指定して読み込み
 env_path = Path(__file__).parent / '.env'
 load_dotenv(dotenv_path=env_path)
@@ -45,6 +50,7 @@ comprehend = boto3.client(
     aws_secret_access_key=aws_secret_access_key,
     region_name=AWS_DEFAULT_REGION
 )
+instrument_boto3(comprehend)
 
 # 入力ディレクトリと出力ディレクトリの設定
 DATA_DIR = Path(__file__).parent / 'data'
@@ -21,12 +21,17 @@ Amazon SES を使用したメール送信サンプル
 """
 
 import os
+import sys
 from pathlib import Path
 
 import boto3
 from botocore.exceptions import ClientError
 from dotenv import load_dotenv
 
+# リポジトリ直下の shared パッケージを読み込めるようにする
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from shared.instrumentation import instrument_boto3
+
 # .envファイルを明示的に指定して読み込み
 # aws01_translate ディレクトリ内に .env があることを想定
 env_path = Path(__file__).parent / '.env'
@@ -55,6 +60,7 @@ ses = boto3.client(
     aws_secret_access_key=aws_secret_access_key,
     region_name=AWS_DEFAULT_REGION
 )
+instrument_boto3(ses)
 
 # .envファイルまたは環境変数からメールアドレスを読み込む
 # これらは事前にSESで検証済みである必要があります（サンドボックス環境の場合、受信者も）。
@@ -0,0 +1,155 @@
+"""
+ベンチマーク用に Vision API と Gemini API の応答を再現するローカルサーバー
+
+このモジュールは以下の機能を提供します：
+- images:annotate と generateContent の応答を、記録済みのJSON（または既定の応答）で返すHTTPサーバー
+- 応答までの待ち時間（平均・ばらつき）とエラー（503）の発生率の設定
+- 受信したリクエスト数とバイト数の集計
+
+Google の API を呼び出さずに、レシート処理の各方式の処理速度を比較するために使用します。
+記録済みの応答を使う場合は、recordings_dir に以下のファイルを配置してください：
+- images_annotate.json: images:annotate の responses 配列の1件分
+- generate_content.json: Gemini が返すJSONテキストの内容（抽出結果の辞書）
+"""
+
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+DEFAULT_ANNOTATE_RESPONSE = {
+    "textAnnotations": [
+        {"description": "サンプル商店\n登録番号 T1234567890123\n合計 ¥1,100\n内消費税 ¥100"},
+        {"description": "サンプル商店", "boundingPoly": {"vertices": [{"x": 10, "y": 10}, {"x": 200, "y": 10}, {"x": 200, "y": 40}, {"x": 10, "y": 40}]}},
+        {"description": "合計", "boundingPoly": {"vertices": [{"x": 10, "y": 100}, {"x": 60, "y": 100}, {"x": 60, "y": 130}, {"x": 10, "y": 130}]}},
+        {"description": "¥1,100", "boundingPoly": {"vertices": [{"x": 150, "y": 100}, {"x": 220, "y": 100}, {"x": 220, "y": 130}, {"x": 150, "y": 130}]}},
+    ]
+}
+
+DEFAULT_GENERATE_RESULT = {
+    "登録番号": "T1234567890123",
+    "購入店": "サンプル商店",
+    "総支払額": 1100,
+    "消費税額": 100,
+}
+
+RECEIPT_ID_PATTERN = re.compile(r"### レシートID: (\S+)")
+
+
+class StubServer:
+    """Vision API と Gemini API の応答を再現するローカルサーバー
+
+    :param latency: 応答までの平均待ち時間（秒）
+    :param jitter: 待ち時間のばらつき（秒）。latency ± jitter の範囲でランダムに待ちます
+    :param error_rate: 503 エラーを返す割合（0〜1）
+    :param recordings_dir: 記録済みの応答を配置したディレクトリ（None の場合は既定の応答）
+    """
+
+    def __init__(self, latency=0.2, jitter=0.05, error_rate=0.0, recordings_dir=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.annotate_response = DEFAULT_ANNOTATE_RESPONSE
+        self.generate_result = DEFAULT_GENERATE_RESULT
+
+        if recordings_dir is not None:
+            recordings_dir = Path(recordings_dir)
+            if (recordings_dir / "images_annotate.json").exists():
+                self.annotate_response = json.loads((recordings_dir / "images_annotate.json").read_text(encoding="utf-8"))
+            if (recordings_dir / "generate_content.json").exists():
+                self.generate_result = json.loads((recordings_dir / "generate_content.json").read_text(encoding="utf-8"))
+
+        self._lock = threading.Lock()
+        self.reset_stats()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._make_handler())
+        self._server.daemon_threads = True
+
+    @property
+    def url(self):
+        """サーバーのURL（http://127.0.0.1:ポート番号）"""
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    def start(self):
+        """別スレッドでサーバーを開始する"""
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        """サーバーを停止する"""
+        self._server.shutdown()
+        self._server.server_close()
+
+    def reset_stats(self):
+        """受信したリクエスト数とバイト数の集計をリセットする"""
+        with self._lock:
+            self.stats = {"requests": 0, "bytes_received": 0, "errors": 0}
+
+    def _record(self, size, is_error):
+        with self._lock:
+            self.stats["requests"] += 1
+            self.stats["bytes_received"] += size
+            self.stats["errors"] += int(is_error)
+
+    def annotate(self, body):
+        """images:annotate の応答を作成する（リクエストの画像数と同じ数の結果を返す）"""
+        return {"responses": [self.annotate_response for _ in body.get("requests", [])]}
+
+    def generate_content(self, body):
+        """generateContent の応答を作成する（複数のレシートをまとめた場合はJSON配列を返す）"""
+        prompt = "".join(part.get("text", "") for content in body.get("contents", []) for part in content.get("parts", []))
+        receipt_ids = RECEIPT_ID_PATTERN.findall(prompt)
+        if receipt_ids:
+            result = [{"id": receipt_id, **self.generate_result} for receipt_id in receipt_ids]
+        else:
+            result = self.generate_result
+
+        return {
+            "candidates": [
+                {
+                    "content": {"parts": [{"text": json.dumps(result, ensure_ascii=False)}], "role": "model"},
+                    "finishReason": "STOP",
+                    "index": 0,
+                }
+            ]
+        }
+
+    def _make_handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                size = int(self.headers.get("Content-Length", 0))
+                body = json.loads(self.rfile.read(size) or b"{}")
+
+                time.sleep(max(0.0, random.uniform(stub.latency - stub.jitter, stub.latency + stub.jitter)))
+
+                is_error = random.random() < stub.error_rate
+                stub._record(size, is_error)
+                if is_error:
+                    self._send_json(503, {"error": {"code": 503, "message": "stub error", "status": "UNAVAILABLE"}})
+                elif self.path.startswith("/v1/images:annotate"):
+                    self._send_json(200, stub.annotate(body))
+                elif ":generateContent" in self.path:
+                    self._send_json(200, stub.generate_content(body))
+                else:
+                    self._send_json(404, {"error": {"code": 404, "message": "not found", "status": "NOT_FOUND"}})
+
+            def _send_json(self, status, payload):
+                data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                # ベンチマークの表示を乱さないようにアクセスログは出力しない
+                pass
+
+        return Handler
@@ -0,0 +1,168 @@
+"""
+OCR結果のバウンディングボックスを使った位置計算モジュール
+
+このモジュールは以下の機能を提供します：
+- 1画像分の text_blocks を NumPy 配列（テキスト・頂点座標）に変換
+- 縦方向の位置によるブロックの行へのまとめ（行の再構成）
+- 読み順（上の行から、行内は左から）への並べ替え
+- 横方向の位置による列の検出
+- 「合計」などのラベルの右側にある値の検索
+
+ブロックごとに Python のループで比較する代わりに、
+全ブロックの座標を配列にまとめて一括で計算します。
+
+必要なライブラリ: numpy
+"""
+
+import json
+from pathlib import Path
+
+import numpy as np
+
+# バウンディングボックスの頂点の数
+VERTEX_COUNT = 4
+
+
+class BlockGeometry:
+    """1画像分のテキストブロックの位置情報を配列として保持するクラス
+
+    :param texts: 各ブロックのテキスト
+    :param boxes: 各ブロックの頂点座標の配列（ブロック数 x 4 x 2）
+    """
+
+    def __init__(self, texts, boxes):
+        self.texts = np.asarray(texts, dtype=object)
+        self.boxes = np.asarray(boxes, dtype=float).reshape(-1, VERTEX_COUNT, 2)
+
+        # 傾いたボックスも扱えるように、頂点を囲む軸に平行な矩形を使う
+        self.left = self.boxes[:, :, 0].min(axis=1)
+        self.right = self.boxes[:, :, 0].max(axis=1)
+        self.top = self.boxes[:, :, 1].min(axis=1)
+        self.bottom = self.boxes[:, :, 1].max(axis=1)
+        self.center_y = (self.top + self.bottom) / 2
+        self.height = self.bottom - self.top
+
+    @classmethod
+    def from_result(cls, result):
+        """OCR結果（save_results で保存した形式）から作成する
+
+        Vision API は 0 の座標を省略するため、欠けている値は 0 とします。
+        """
+        blocks = result.get("text_blocks", [])
+        texts = [block.get("text", "") for block in blocks]
+        boxes = np.zeros((len(blocks), VERTEX_COUNT, 2))
+        for i, block in enumerate(blocks):
+            for j, vertex in enumerate(block.get("bounding_box", {}).get("vertices", [])[:VERTEX_COUNT]):
+                boxes[i, j] = (vertex.get("x", 0), vertex.get("y", 0))
+        return cls(texts, boxes)
+
+    def __len__(self):
+        return len(self.texts)
+
+    def line_ids(self, tolerance=0.5):
+        """各ブロックが属する行の番号（上の行から 0, 1, 2, ...）を返す
+
+        ブロックを縦方向の中心で並べ、隣り合うブロックの中心の差が
+        ブロックの高さの中央値 x tolerance を超えたところで行を区切ります。
+        """
+        if len(self) == 0:
+            return np.zeros(0, dtype=int)
+
+        order = np.argsort(self.center_y, kind="stable")
+        threshold = np.median(self.height) * tolerance
+        breaks = np.diff(self.center_y[order]) > threshold
+
+        ids = np.empty(len(self), dtype=int)
+        ids[order] = np.concatenate(([0], np.cumsum(breaks)))
+        return ids
+
+    def reading_order(self, tolerance=0.5):
+        """読み順（上の行から、行内は左から）に並べたブロックのインデックスを返す"""
+        return np.lexsort((self.left, self.line_ids(tolerance)))
+
+    def lines(self, tolerance=0.5, separator=" "):
+        """行ごとにブロックのテキストを連結した文字列のリストを返す"""
+        order = self.reading_order(tolerance)
+        line_ids = self.line_ids(tolerance)[order]
+        if len(order) == 0:
+            return []
+
+        # 行番号が変わる位置で区切る
+        starts = np.flatnonzero(np.diff(line_ids)) + 1
+        return [separator.join(self.texts[group]) for group in np.split(order, starts)]
+
+    def column_ids(self, min_gap=None, edge="left"):
+        """各ブロックが属する列の番号（左の列から 0, 1, 2, ...）を返す
+
+        ブロックの端（edge が "left" なら左端、"right" なら右端）の x 座標を並べ、
+        隣り合う値の差が min_gap を超えたところで列を区切ります。
+        min_gap を省略した場合は、ブロックの高さの中央値の2倍を使います。
+        """
+        if len(self) == 0:
+            return np.zeros(0, dtype=int)
+
+        x = self.left if edge == "left" else self.right
+        if min_gap is None:
+            min_gap = np.median(self.height) * 2
+
+        order = np.argsort(x, kind="stable")
+        breaks = np.diff(x[order]) > min_gap
+
+        ids = np.empty(len(self), dtype=int)
+        ids[order] = np.concatenate(([0], np.cumsum(breaks)))
+        return ids
+
+    def nearest_right(self, label_indices, min_overlap=0.5):
+        """各ラベルのブロックについて、同じ高さで右側にある最も近いブロックのインデックスを返す
+
+        縦方向の重なりが、低い方のブロックの高さの min_overlap 倍以上あるブロックを同じ高さとみなします。
+        該当するブロックがない場合は -1 を返します。
+        """
+        label_indices = np.asarray(label_indices, dtype=int)
+        if len(label_indices) == 0 or len(self) == 0:
+            return np.full(len(label_indices), -1)
+
+        # ラベル x 全ブロックの行列で一括計算する
+        overlap = np.minimum(self.bottom[label_indices, None], self.bottom[None, :]) - np.maximum(
+            self.top[label_indices, None], self.top[None, :]
+        )
+        min_height = np.maximum(np.minimum(self.height[label_indices, None], self.height[None, :]), 1)
+        distance = self.left[None, :] - self.right[label_indices, None]
+
+        candidates = (overlap >= min_height * min_overlap) & (distance >= 0)
+        candidates[np.arange(len(label_indices)), label_indices] = False
+
+        distance = np.where(candidates, distance, np.inf)
+        nearest = distance.argmin(axis=1)
+        return np.where(candidates.any(axis=1), nearest, -1)
+
+    def find_value_right_of(self, label, min_overlap=0.5):
+        """テキストに label を含むブロックごとに、その右側にある値を (ラベル, 値) のリストで返す"""
+        label_indices = np.flatnonzero([label in text for text in self.texts])
+        values = self.nearest_right(label_indices, min_overlap)
+        return [(self.texts[i], self.texts[j]) for i, j in zip(label_indices, values) if j >= 0]
+
+
+def main():
+    print("OCR結果の位置計算サンプル")
+
+    ocr_dir = Path(__file__).parent / "ocr_results"
+
+    # ディレクトリが存在するか確認
+    if not ocr_dir.exists() or not ocr_dir.is_dir():
+        print(f"エラー: ディレクトリ '{ocr_dir}' が見つからないか、ディレクトリではありません")
+        return
+
+    for json_file in sorted(ocr_dir.glob("*.json")):
+        result = json.loads(json_file.read_text(encoding="utf-8"))
+        geometry = BlockGeometry.from_result(result)
+
+        print(f"\n'{json_file.name}' ({len(geometry)}ブロック, {geometry.column_ids().max(initial=-1) + 1}列)")
+        for line in geometry.lines(separator=""):
+            print(f"  {line}")
+        for label, value in geometry.find_value_right_of("合計"):
+            print(f"  -> {label}: {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,365 @@
+"""
+Gemini を使用してレシートの情報を抽出する分析クラス
+
+このモジュールは以下の機能を提供します：
+- GenerativeModel を1度だけ作成し、複数のレシートの分析で使い回す ReceiptAnalyzer クラス
+- 定型的なレシートはルールベースで抽出し、判定できない場合のみ Gemini を使用
+- レート制限（429）や一時的なエラーの際の、待ち時間を延ばしながらの再試行
+- スレッドプールを使用した複数のOCR結果の並行分析（結果は入力と同じ順序）
+- Gemini の応答のキャッシュ（モデル名・生成設定・プロンプトのバージョン・OCRテキストをキーに使用）
+- 応答のスキーマを指定し、temperature 0 で抽出する構造化出力モード
+  （登録番号や金額の形式を確認し、不正な応答の場合のみ決められた回数まで再試行）
+- 複数のレシートを1回のリクエストにまとめて分析するパッキングモード
+  （トークン数の上限で自動的に分割し、不正な項目は1件ずつ再分析）
+
+vision_03〜05 の analyze_receipt_json はファイルごとに GenerativeModel を作成しますが、
+このクラスを使うと作成は1度だけで済み、複数のファイルを並行して分析できます。
+"""
+
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import google.generativeai as genai
+from google.api_core import exceptions
+
+from shared.instrumentation import instrument
+
+from receipt_prompt import PROMPT_VERSION, build_packed_prompt, build_prompt, compact_ocr_text, estimate_tokens
+from receipt_rules import FIELD_NAMES, extract_receipt_fields, validate_receipt_fields
+from result_cache import make_key
+
+MODEL_NAME = "gemini-1.5-pro"
+GENERATION_CONFIG = {
+    "temperature": 0.7,
+    "response_mime_type": "application/json",
+}
+
+# 構造化出力モードで使用する応答のスキーマ
+RESPONSE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "登録番号": {"type": "string", "nullable": True},
+        "購入店": {"type": "string", "nullable": True},
+        "総支払額": {"type": "integer"},
+        "消費税額": {"type": "integer", "nullable": True},
+    },
+    "required": ["登録番号", "購入店", "総支払額", "消費税額"],
+}
+
+STRUCTURED_GENERATION_CONFIG = {
+    "temperature": 0,
+    "response_mime_type": "application/json",
+    "response_schema": RESPONSE_SCHEMA,
+}
+
+# 構造化出力モードで、不正な応答の場合に再試行する最大回数
+RETRY_BUDGET = 2
+
+# パッキングモードで1回のリクエストにまとめるレシート数と、OCRテキストの合計トークン数の上限
+PACK_SIZE = 8
+MAX_PACK_TOKENS = 8000
+
+# Gemini の応答のキャッシュファイル
+CACHE_PATH = Path(__file__).parent / "llm_cache.sqlite3"
+
+# 同時に分析するファイル数の上限
+MAX_WORKERS = 4
+
+# 再試行の対象とする一時的なエラー
+RETRYABLE_ERRORS = (
+    exceptions.ResourceExhausted,
+    exceptions.TooManyRequests,
+    exceptions.ServiceUnavailable,
+    exceptions.InternalServerError,
+    exceptions.DeadlineExceeded,
+)
+
+
+class ReceiptAnalyzer:
+    """レシートのOCR結果から情報を抽出するクラス
+
+    :param model_name: 使用する Gemini のモデル名
+    :param generation_config: 生成時の設定
+    :param use_rules: ルールベースの抽出を先に試すかどうか
+    :param max_retries: 一時的なエラーの際に再試行する最大回数
+    :param base_delay: 再試行までの待ち時間の基準（秒）。再試行のたびに2倍になります
+    :param cache: Gemini の応答を保存する ResultCache（None の場合はキャッシュしない）
+    :param structured: 構造化出力モード（スキーマ指定・temperature 0・応答の形式確認）を使うかどうか
+    :param retry_budget: 構造化出力モードで、不正な応答の場合に再試行する最大回数
+    """
+
+    def __init__(
+        self,
+        model_name=MODEL_NAME,
+        generation_config=None,
+        use_rules=True,
+        max_retries=5,
+        base_delay=2.0,
+        cache=None,
+        structured=False,
+        retry_budget=RETRY_BUDGET,
+    ):
+        self.model_name = model_name
+        self.structured = structured
+        self.retry_budget = retry_budget
+        if generation_config is None:
+            generation_config = STRUCTURED_GENERATION_CONFIG if structured else GENERATION_CONFIG
+        self.generation_config = generation_config
+        self.use_rules = use_rules
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.cache = cache
+        self.model = genai.GenerativeModel(model_name, generation_config=self.generation_config)
+
+        # レート制限を受けたら、全てのスレッドで次の呼び出しを待たせる
+        self._lock = threading.Lock()
+        self._paused_until = 0.0
+
+    def generate(self, prompt, generation_config=None):
+        """プロンプトを送信し、応答のテキストを返す（一時的なエラーの場合は再試行する）
+
+        generation_config を指定すると、モデル作成時の生成設定の代わりに使用します。
+        """
+        # 再試行を含めて1回の呼び出しとして計測する
+        with instrument("gemini", "generateContent") as call:
+            call.bytes_sent = len(prompt.encode("utf-8"))
+            for attempt in range(self.max_retries + 1):
+                self._wait_if_paused()
+                try:
+                    text = self.model.generate_content(prompt, generation_config=generation_config).text
+                    call.bytes_received = len(text.encode("utf-8"))
+                    return text
+                except RETRYABLE_ERRORS as e:
+                    if attempt == self.max_retries:
+                        raise
+                    delay = self.base_delay * 2**attempt * random.uniform(1.0, 1.5)
+                    print(f"警告: 一時的なエラーのため {delay:.1f}秒後に再試行します: {e}")
+                    call.add_retry()
+                    self._pause(delay)
+
+    def analyze_text(self, text_content):
+        """OCRのテキストを Gemini で分析し、結果を辞書で返す
+
+        キャッシュに同じ条件の結果がある場合は、Gemini を呼び出さずにその結果を返します。
+        """
+        if self.cache is None:
+            return self._extract(text_content)
+
+        key = self.cache_key(text_content)
+        result = self.cache.get(key)
+        if result is None:
+            result = self._extract(text_content)
+            self.cache.put(key, result)
+        return result
+
+    def _extract(self, text_content):
+        """Gemini で情報を抽出する（構造化出力モードでは応答の形式を確認する）"""
+        prompt = build_prompt(text_content)
+        if not self.structured:
+            return json.loads(self.generate(prompt))
+
+        errors = []
+        for attempt in range(self.retry_budget + 1):
+            if errors:
+                # 再試行時は、前回の応答の問題点を伝えて修正を促す
+                print(f"警告: 応答の形式が正しくないため再試行します（{attempt}/{self.retry_budget}）: {errors}")
+                retry_prompt = prompt + "\n\n前回の応答には次の問題がありました。修正して返してください:\n" + "\n".join(errors)
+            else:
+                retry_prompt = prompt
+
+            try:
+                result, errors = validate_receipt_fields(json.loads(self.generate(retry_prompt)))
+            except json.JSONDecodeError as e:
+                errors = [f"JSONとして解析できません: {e}"]
+            if not errors:
+                return result
+
+        raise ValueError(f"{self.retry_budget}回再試行しても正しい形式の応答が得られませんでした: {errors}")
+
+    def cache_key(self, text_content):
+        """モデル名・生成設定・プロンプトのバージョン・OCRテキストからキャッシュのキーを作成する"""
+        return make_key("gemini", self.model_name, self.generation_config, PROMPT_VERSION, text_content)
+
+    def analyze(self, ocr_data):
+        """OCR結果（save_results で保存した形式）を分析し、結果を辞書で返す"""
+        if self.use_rules:
+            fields, missing = extract_receipt_fields(ocr_data)
+            if not missing:
+                return fields
+        return self.analyze_text(compact_ocr_text(ocr_data))
+
+    def analyze_file(self, json_path):
+        """OCR結果のJSONファイルを分析し、結果を辞書で返す"""
+        with open(json_path, "r", encoding="utf-8") as file:
+            ocr_data = json.load(file)
+        return self.analyze(ocr_data)
+
+    def analyze_many(self, ocr_items, pack_size=PACK_SIZE, max_pack_tokens=MAX_PACK_TOKENS, max_workers=MAX_WORKERS):
+        """複数のOCR結果を、数件ずつ1回のリクエストにまとめて分析する
+
+        ルールベースで判定できたものとキャッシュにあるものは Gemini に送信しません。
+        まとめたリクエストは max_workers 件まで並行して送信します。
+
+        :param ocr_items: (レシートID, OCR結果) のリスト
+        :return: 入力と同じ順序の結果のリスト（分析に失敗したものは None）
+        """
+        results = [None] * len(ocr_items)
+        pending = []
+        for i, (_, ocr_data) in enumerate(ocr_items):
+            if self.use_rules:
+                fields, missing = extract_receipt_fields(ocr_data)
+                if not missing:
+                    results[i] = fields
+                    continue
+
+            text_content = compact_ocr_text(ocr_data)
+            cached = self.cache.get(self.cache_key(text_content)) if self.cache is not None else None
+            if cached is not None:
+                results[i] = cached
+            else:
+                pending.append((i, text_content))
+
+        packs = list(self._make_packs(pending, pack_size, max_pack_tokens))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for pack, pack_results in zip(packs, executor.map(self._analyze_pack, packs)):
+                for (i, _), result in zip(pack, pack_results):
+                    results[i] = result
+        return results
+
+    def _make_packs(self, pending, pack_size, max_pack_tokens):
+        """(インデックス, テキスト) のリストを、件数とトークン数の上限に収まるように分割する"""
+        pack = []
+        pack_tokens = 0
+        for item in pending:
+            tokens = estimate_tokens(item[1])
+            if pack and (len(pack) >= pack_size or pack_tokens + tokens > max_pack_tokens):
+                yield pack
+                pack = []
+                pack_tokens = 0
+            pack.append(item)
+            pack_tokens += tokens
+
+        if pack:
+            yield pack
+
+    def _analyze_pack(self, pack):
+        """まとめたレシートを1回のリクエストで分析し、pack と同じ順序の結果のリストを返す"""
+        if len(pack) == 1:
+            return [self._analyze_single(pack[0][1])]
+
+        items = [(f"r{n}", text_content) for n, (_, text_content) in enumerate(pack, 1)]
+        try:
+            response = json.loads(self.generate(build_packed_prompt(items), self._packed_generation_config()))
+        except Exception as e:
+            # 応答が途中で切れた場合などは、半分に分けて再送信する
+            print(f"警告: {len(pack)}件まとめた分析に失敗したため、分割して再送信します: {e}")
+            middle = len(pack) // 2
+            return self._analyze_pack(pack[:middle]) + self._analyze_pack(pack[middle:])
+
+        entries = {}
+        if isinstance(response, list):
+            entries = {entry.get("id"): entry for entry in response if isinstance(entry, dict)}
+
+        results = []
+        for receipt_id, text_content in items:
+            result = self._accept_packed_entry(entries.get(receipt_id))
+            if result is None:
+                # 不正な項目や欠けている項目は、1件ずつ分析し直す
+                result = self._analyze_single(text_content)
+            elif self.cache is not None:
+                self.cache.put(self.cache_key(text_content), result)
+            results.append(result)
+        return results
+
+    def _accept_packed_entry(self, entry):
+        """まとめた応答の1件分を確認し、正しい形式であれば結果を返す（不正な場合は None）"""
+        if not isinstance(entry, dict):
+            return None
+
+        result = {name: value for name, value in entry.items() if name != "id"}
+        if self.structured:
+            result, errors = validate_receipt_fields(result)
+            return None if errors else result
+        return result if all(name in result for name in FIELD_NAMES) else None
+
+    def _analyze_single(self, text_content):
+        """1件だけ分析する（失敗した場合は警告を表示して None を返す）"""
+        try:
+            return self.analyze_text(text_content)
+        except Exception as e:
+            print(f"警告: レシートの分析中にエラーが発生しました: {e}")
+            return None
+
+    def _packed_generation_config(self):
+        """まとめて分析する際の生成設定（構造化出力モードでは配列のスキーマを指定する）"""
+        if not self.structured:
+            return self.generation_config
+
+        item_schema = {
+            **RESPONSE_SCHEMA,
+            "properties": {"id": {"type": "string"}, **RESPONSE_SCHEMA["properties"]},
+            "required": ["id"] + RESPONSE_SCHEMA["required"],
+        }
+        return {**self.generation_config, "response_schema": {"type": "array", "items": item_schema}}
+
+    def _pause(self, delay):
+        """全てのスレッドの呼び出しを delay 秒間止める"""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + delay)
+
+    def _wait_if_paused(self):
+        """レート制限による待機中であれば、解除されるまで待つ"""
+        with self._lock:
+            remaining = self._paused_until - time.monotonic()
+        if remaining > 0:
+            time.sleep(remaining)
+
+
+def _analyze_or_none(analyzer, json_path):
+    """ファイルを分析し、失敗した場合は警告を表示して None を返す"""
+    try:
+        return analyzer.analyze_file(json_path)
+    except json.JSONDecodeError as e:
+        print(f"警告: ファイル '{json_path.name}' の解析結果をJSONとして解析できませんでした: {e}")
+    except Exception as e:
+        print(f"警告: ファイル '{json_path.name}' の分析中にエラーが発生しました: {e}")
+    return None
+
+
+def analyze_files_concurrently(analyzer, json_paths, max_workers=MAX_WORKERS):
+    """複数のOCR結果を並行して分析し、入力と同じ順序で (ファイルパス, 結果) のリストを返す関数
+
+    分析に失敗したファイルの結果は None になります。
+    """
+    json_paths = list(json_paths)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = executor.map(lambda json_path: _analyze_or_none(analyzer, json_path), json_paths)
+        return list(zip(json_paths, results))
+
+
+def analyze_files_packed(analyzer, json_paths, pack_size=PACK_SIZE, max_workers=MAX_WORKERS):
+    """複数のOCR結果を数件ずつまとめて分析し、入力と同じ順序で (ファイルパス, 結果) のリストを返す関数
+
+    分析に失敗したファイルの結果は None になります。
+    """
+    json_paths = list(json_paths)
+    ocr_items = []
+    for json_path in json_paths:
+        try:
+            with open(json_path, "r", encoding="utf-8") as file:
+                ocr_items.append((json_path.stem, json.load(file)))
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"警告: ファイル '{json_path.name}' を読み込めませんでした: {e}")
+            ocr_items.append((json_path.stem, None))
+
+    readable = [(i, item) for i, item in enumerate(ocr_items) if item[1] is not None]
+    analyzed = analyzer.analyze_many([item for _, item in readable], pack_size=pack_size, max_workers=max_workers)
+
+    results = [None] * len(json_paths)
+    for (i, _), result in zip(readable, analyzed):
+        results[i] = result
+    return list(zip(json_paths, results))
@@ -0,0 +1,110 @@
+"""
+Gemini に送信するレシート分析用プロンプトを作成するモジュール
+
+このモジュールは以下の機能を提供します：
+- レシート分析用の指示文（プロンプト）
+- OCR結果から、分析に必要なテキストだけを取り出したプロンプト本文の作成
+- OCR結果全体を送信した場合と比べたトークン数の表示
+- 複数のレシートを1回のリクエストで分析するためのプロンプトの作成
+
+OCR結果のJSONには、ブロックごとの座標や信頼度が含まれています。
+これらは Gemini での分析には不要なため、全文テキスト（または位置から再構成した行）だけを送信し、
+トークン数と待ち時間を減らします。
+"""
+
+import json
+
+import google.generativeai as genai
+
+from shared.instrumentation import instrument
+
+from ocr_geometry import BlockGeometry
+
+# プロンプトの内容を変更した場合は値を更新する（キャッシュのキーに使用）
+PROMPT_VERSION = "1"
+
+RECEIPT_PROMPT = """
+このレシートから以下の情報を抽出してください：
+1. 登録番号（登録番号もしくは事業者登録番号）
+2. 購入店名
+3. 総支払額
+4. 消費税額
+
+以下の形式でJSON形式で返してください：
+{
+    "登録番号": "番号",
+    "購入店": "店名",
+    "総支払額": "金額",
+    "消費税額": "金額"
+}
+"""
+
+PACKED_PROMPT = """
+以下の複数のレシートそれぞれから、次の情報を抽出してください：
+1. 登録番号（登録番号もしくは事業者登録番号）
+2. 購入店名
+3. 総支払額
+4. 消費税額
+
+各レシートは「### レシートID: ...」の行で区切られています。
+レシートごとに1つのオブジェクトを作成し、以下の形式のJSON配列で返してください：
+[
+    {
+        "id": "レシートID",
+        "登録番号": "番号",
+        "購入店": "店名",
+        "総支払額": "金額",
+        "消費税額": "金額"
+    }
+]
+"""
+
+# トークン数の見積もりに使う、1トークンあたりの文字数（日本語は1文字1トークン程度とみなす）
+CHARS_PER_TOKEN = 1
+
+
+def compact_ocr_text(ocr_data, mode="full_text"):
+    """OCR結果から、プロンプトに含めるテキストだけを取り出す関数
+
+    :param ocr_data: OCR結果（save_results で保存した形式）
+    :param mode: "full_text" なら全文テキスト、"lines" ならブロックの位置から再構成した行を使用
+    :return: プロンプトに含めるテキスト
+    """
+    if mode == "lines" and ocr_data.get("text_blocks"):
+        return "\n".join(BlockGeometry.from_result(ocr_data).lines(separator=" "))
+    if "full_text" in ocr_data:
+        return ocr_data["full_text"]
+    if "text" in ocr_data:
+        return ocr_data["text"]
+    # 想定外の形式の場合は、これまでどおり JSON 全体を送信する
+    return json.dumps(ocr_data, ensure_ascii=False)
+
+
+def build_prompt(text_content):
+    """指示文と OCR のテキストを組み合わせたプロンプトを作成する関数"""
+    return RECEIPT_PROMPT + "\n\nOCRのテキスト結果:\n" + text_content
+
+
+def build_packed_prompt(items):
+    """複数のレシートを1回で分析するプロンプトを作成する関数
+
+    :param items: (レシートID, OCRのテキスト) のリスト
+    """
+    sections = [f"### レシートID: {receipt_id}\n{text_content}" for receipt_id, text_content in items]
+    return PACKED_PROMPT + "\n\nOCRのテキスト結果:\n" + "\n\n".join(sections)
+
+
+def estimate_tokens(text):
+    """API を呼び出さずに、テキストのトークン数を大まかに見積もる関数"""
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def print_token_counts(model_name, ocr_data, mode="full_text"):
+    """OCR結果全体を送信した場合と、テキストだけを送信した場合のトークン数を表示する関数"""
+    model = genai.GenerativeModel(model_name)
+    with instrument("gemini", "countTokens"):
+        before = model.count_tokens(build_prompt(json.dumps(ocr_data))).total_tokens
+    with instrument("gemini", "countTokens"):
+        after = model.count_tokens(build_prompt(compact_ocr_text(ocr_data, mode))).total_tokens
+    print(f"プロンプトのトークン数: {before} -> {after}（{before - after} 削減）")
+    return before, after
@@ -0,0 +1,202 @@
+"""
+ルールベースでレシートの情報を抽出するモジュール
+
+このモジュールは、OCR結果から以下の情報を正規表現と位置情報を使って抽出します：
+- 登録番号（T + 13桁の適格請求書発行事業者登録番号）
+- 購入店名
+- 総支払額
+- 消費税額
+
+また、Gemini が返した抽出結果の形式を確認する機能も提供します。
+
+定型的なレシートはこのモジュールだけで処理し、
+確実に判定できなかった項目があるレシートだけを Gemini で分析することで、
+待ち時間と API の利用料金を減らします。
+"""
+
+import re
+import unicodedata
+
+from ocr_geometry import BlockGeometry
+
+# 登録番号: T の後に13桁の数字（途中の空白やハイフンを許容）
+REGISTRATION_NUMBER_PATTERN = re.compile(r"T[\s\-]?(\d(?:[\s\-]?\d){12})(?![\s\-]?\d)")
+
+# 金額: ラベルの後に続く最初の数値（税率や点数などの数値は除く）
+AMOUNT = r"[^¥\n]*?¥?\s*(\d{1,3}(?:,\d{3})+|\d+)(?![\d,]|\s*[%点個])"
+
+# 総支払額のラベル（小計・対象額の行は除く）
+TOTAL_PATTERN = re.compile(r"(?:総合計|お買上計|お買上げ計|お会計|ご請求額|合計)" + AMOUNT)
+TOTAL_EXCLUDE_PATTERN = re.compile(r"小計|対象")
+
+# 消費税額のラベルと税率
+TAX_PATTERN = re.compile(r"(?:消費税等?|内税|税額)" + AMOUNT)
+TAX_RATE_PATTERN = re.compile(r"(\d{1,2})\s*%")
+
+# 店名とみなす語句（先頭の数行だけを対象にする）
+STORE_NAME_PATTERN = re.compile(r"店|株式会社|\(株\)|ストア|マート|商店|薬局|スーパー|ショップ")
+STORE_NAME_SEARCH_LINES = 5
+
+FIELD_NAMES = ["登録番号", "購入店", "総支払額", "消費税額"]
+
+
+def normalize_text(text):
+    """全角の英数字・記号を半角に揃える関数"""
+    return unicodedata.normalize("NFKC", text)
+
+
+def receipt_lines(ocr_data):
+    """OCR結果からレシートの行のリストを作成する関数
+
+    全文テキストの行に加えて、ブロックの位置から再構成した行も返します。
+    ラベルと金額が全文テキスト上で別の行になっている場合も、同じ行として扱えます。
+    """
+    full_text = ocr_data.get("full_text", ocr_data.get("text", ""))
+    lines = [normalize_text(line) for line in full_text.splitlines()]
+
+    if ocr_data.get("text_blocks"):
+        geometry = BlockGeometry.from_result(ocr_data)
+        lines += [normalize_text(line) for line in geometry.lines(separator=" ")]
+
+    return [line.strip() for line in lines if line.strip()]
+
+
+def _to_amount(text):
+    """カンマ区切りの金額の文字列を整数に変換する関数"""
+    return int(text.replace(",", ""))
+
+
+def find_registration_number(lines):
+    """登録番号を探す（候補が1つに定まらない場合は None）"""
+    candidates = set()
+    for line in lines:
+        for match in REGISTRATION_NUMBER_PATTERN.finditer(line):
+            candidates.add("T" + re.sub(r"\D", "", match.group(1)))
+    return candidates.pop() if len(candidates) == 1 else None
+
+
+def find_total(lines):
+    """総支払額を探す（候補が1つに定まらない場合は None）"""
+    candidates = set()
+    for line in lines:
+        if TOTAL_EXCLUDE_PATTERN.search(line):
+            continue
+        for match in TOTAL_PATTERN.finditer(line):
+            candidates.add(_to_amount(match.group(1)))
+    return candidates.pop() if len(candidates) == 1 else None
+
+
+def find_tax(lines):
+    """消費税額を探す（候補が1つに定まらない場合は None）
+
+    8%と10%のように税率ごとに記載されている場合は、その合計を返します。
+    """
+    by_rate = {}
+    for line in lines:
+        rate_match = TAX_RATE_PATTERN.search(line)
+        rate = rate_match.group(1) if rate_match else None
+        for match in TAX_PATTERN.finditer(line):
+            by_rate.setdefault(rate, set()).add(_to_amount(match.group(1)))
+
+    # 税率ごとに金額が1つに定まらない場合は判定しない
+    if not by_rate or any(len(amounts) != 1 for amounts in by_rate.values()):
+        return None
+
+    unrated = by_rate.pop(None, None)
+    rated_total = sum(amounts.pop() for amounts in by_rate.values()) if by_rate else None
+
+    if unrated is None:
+        return rated_total
+    unrated_amount = unrated.pop()
+    # 税率のない行は合計欄とみなし、税率ごとの合計と一致する場合のみ採用する
+    if rated_total is None or unrated_amount == rated_total:
+        return unrated_amount
+    return None
+
+
+def find_store_name(lines):
+    """先頭の数行から店名らしい行を探す（見つからない場合は None）"""
+    for line in lines[:STORE_NAME_SEARCH_LINES]:
+        if STORE_NAME_PATTERN.search(line) and not REGISTRATION_NUMBER_PATTERN.search(line):
+            return line
+    return None
+
+
+def extract_receipt_fields(ocr_data):
+    """OCR結果からレシートの情報を抽出する関数
+
+    :param ocr_data: OCR結果（save_results で保存した形式）
+    :return: (抽出結果の辞書, 確実に判定できなかった項目名のリスト)
+    """
+    lines = receipt_lines(ocr_data)
+
+    total = find_total(lines)
+    tax = find_tax(lines)
+    # 消費税額が総支払額以上になっている場合は誤認識とみなす
+    if total is not None and tax is not None and tax >= total:
+        tax = None
+
+    fields = {
+        "登録番号": find_registration_number(lines),
+        "購入店": find_store_name(lines),
+        "総支払額": str(total) if total is not None else None,
+        "消費税額": str(tax) if tax is not None else None,
+    }
+    missing = [name for name in FIELD_NAMES if fields[name] is None]
+    return fields, missing
+
+
+def _parse_amount(value):
+    """金額を表す値（整数、または "¥1,234" や "1,234円" などの文字列）を整数に変換する関数"""
+    if isinstance(value, bool):
+        raise ValueError(f"金額として解釈できません: {value!r}")
+    if isinstance(value, int):
+        return value
+    text = normalize_text(str(value)).replace("¥", "").replace("円", "").replace(",", "").strip()
+    if not text.isdigit():
+        raise ValueError(f"金額として解釈できません: {value!r}")
+    return int(text)
+
+
+def validate_receipt_fields(result):
+    """抽出結果の形式を確認し、正規化した結果を返す関数
+
+    登録番号は "T" + 13桁の数字（記載がない場合は None）、
+    金額は数字だけの文字列に揃えます。
+
+    :param result: 抽出結果の辞書
+    :return: (正規化した結果の辞書, 問題点のリスト)
+    """
+    if not isinstance(result, dict):
+        return None, ["結果がJSONオブジェクトではありません"]
+
+    errors = [f"項目 '{name}' がありません" for name in FIELD_NAMES if name not in result]
+    normalized = dict(result)
+
+    registration_number = result.get("登録番号")
+    if registration_number:
+        digits = re.sub(r"[\s\-]", "", normalize_text(str(registration_number)))
+        if re.fullmatch(r"T\d{13}", digits):
+            normalized["登録番号"] = digits
+        else:
+            errors.append(f"登録番号の形式が正しくありません: {registration_number!r}")
+    else:
+        normalized["登録番号"] = None
+
+    amounts = {}
+    for name in ("総支払額", "消費税額"):
+        if result.get(name) is None:
+            continue
+        try:
+            amounts[name] = _parse_amount(result[name])
+            normalized[name] = str(amounts[name])
+        except ValueError as e:
+            errors.append(f"{name}: {e}")
+
+    if "総支払額" in result and result.get("総支払額") is None:
+        errors.append("総支払額がありません")
+    if amounts.get("消費税額") is not None and amounts.get("総支払額") is not None:
+        if amounts["消費税額"] >= amounts["総支払額"]:
+            errors.append("消費税額が総支払額以上になっています")
+
+    return normalized, errors
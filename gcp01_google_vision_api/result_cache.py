@@ -0,0 +1,157 @@
+"""
+API呼び出し結果を保存する永続キャッシュ
+
+このモジュールは以下の機能を提供します：
+- SQLite を使用した、キーと結果(JSON)の永続キャッシュ
+- 画像の内容（SHA-256）と送信する機能設定から OCR 結果のキーを作成
+- ヒット数・ミス数の集計
+- 保存からの経過日数と合計サイズによる古いエントリの削除
+
+ファイル名ではなく画像の内容をキーにしているため、
+ファイル名を変更しただけの画像を再度 API に送信することはありません。
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+# 画像ファイルのハッシュ計算時に読み込むサイズ
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def file_sha256(file_path):
+    """ファイルの内容の SHA-256 を計算する関数"""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as file:
+        for chunk in iter(lambda: file.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def make_key(*parts):
+    """任意の値の組み合わせから、キャッシュのキーを作成する関数"""
+    serialized = json.dumps(parts, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+
+
+def ocr_cache_key(image_path, features):
+    """画像の内容と機能設定（TEXT_DETECTION, maxResults など）から OCR 結果のキーを作成する関数"""
+    return make_key("ocr", file_sha256(image_path), features)
+
+
+class ResultCache:
+    """SQLite を使用した API 呼び出し結果の永続キャッシュ
+
+    :param db_path: SQLite データベースファイルのパス
+    :param max_age_days: エントリを保持する最大日数（None の場合は無期限）
+    :param max_bytes: 保持する結果の合計サイズの上限（None の場合は無制限）
+    """
+
+    def __init__(self, db_path, max_age_days=90, max_bytes=500 * 1024 * 1024):
+        self.db_path = Path(db_path)
+        self.max_age_days = max_age_days
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+        # 並行処理のスクリプトからも使えるように、接続はロックで保護する
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS cache (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+        self.evict()
+
+    def get(self, key):
+        """キーに対応する結果を返す（存在しない場合は None）"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, created_at FROM cache WHERE key = ?", (key,)).fetchone()
+            if row is None or self._is_expired(row[1], now):
+                self.misses += 1
+                return None
+
+            self._conn.execute("UPDATE cache SET accessed_at = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, key, value):
+        """結果をキャッシュに保存する"""
+        serialized = json.dumps(value, ensure_ascii=False)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, serialized, len(serialized.encode("utf-8")), now, now),
+            )
+            self._conn.commit()
+
+    def evict(self):
+        """期限切れのエントリと、合計サイズの上限を超えた分の古いエントリを削除する
+
+        :return: 削除したエントリの数
+        """
+        removed = 0
+        with self._lock:
+            if self.max_age_days is not None:
+                cutoff = time.time() - self.max_age_days * 24 * 60 * 60
+                removed += self._conn.execute("DELETE FROM cache WHERE created_at < ?", (cutoff,)).rowcount
+
+            if self.max_bytes is not None:
+                total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM cache").fetchone()[0]
+                if total > self.max_bytes:
+                    # 最後に参照された日時が古いものから削除する
+                    rows = self._conn.execute("SELECT key, size FROM cache ORDER BY accessed_at").fetchall()
+                    for key, size in rows:
+                        if total <= self.max_bytes:
+                            break
+                        self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+                        total -= size
+                        removed += 1
+
+            self._conn.commit()
+        return removed
+
+    def stats(self):
+        """ヒット数・ミス数・エントリ数・合計サイズを返す"""
+        with self._lock:
+            entries, total = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache").fetchone()
+        return {"hits": self.hits, "misses": self.misses, "entries": entries, "bytes": total}
+
+    def print_stats(self):
+        """キャッシュの統計情報を表示する"""
+        stats = self.stats()
+        print(
+            f"キャッシュ: ヒット {stats['hits']}件 / ミス {stats['misses']}件 "
+            f"(保存件数: {stats['entries']}件, 合計サイズ: {stats['bytes'] / 1024:.1f}KB)"
+        )
+
+    def close(self):
+        """データベースへの接続を閉じる"""
+        with self._lock:
+            self._conn.close()
+
+    def _is_expired(self, created_at, now):
+        """エントリが保持期限を過ぎているかどうかを判定する"""
+        if self.max_age_days is None:
+            return False
+        return created_at < now - self.max_age_days * 24 * 60 * 60
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,86 @@
+"""
+レシートの分析結果を summary.csv に追記保存するモジュール
+
+このモジュールは以下の機能を提供します：
+- 分析結果を、元のOCR結果のファイル名と内容のハッシュ付きで summary.csv に追記
+- 分析済み（ファイル名とハッシュが一致する）のOCR結果の判定
+- summary.csv からの summary.xlsx の作成
+
+毎回全てのOCR結果を分析して summary.csv を作り直す代わりに、
+新しく追加・変更されたOCR結果の分だけを追記することで、処理量をレシートの追加分に抑えます。
+"""
+
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from receipt_rules import FIELD_NAMES
+
+KEY_COLUMNS = ["source_file", "content_hash"]
+COLUMNS = KEY_COLUMNS + FIELD_NAMES
+
+
+class IncrementalSummaryWriter:
+    """分析結果を summary.csv に追記保存するクラス
+
+    :param csv_path: summary.csv のパス
+    """
+
+    def __init__(self, csv_path):
+        self.csv_path = Path(csv_path)
+        self._keys = set()
+
+        if not self.csv_path.exists():
+            return
+
+        existing = pd.read_csv(self.csv_path, dtype=str, keep_default_na=False, encoding="utf-8")
+        if list(existing.columns) != COLUMNS:
+            # 以前の形式（ファイル名とハッシュの列がない）の場合は退避して作り直す
+            backup_path = self._backup_path()
+            self.csv_path.replace(backup_path)
+            print(f"警告: '{self.csv_path.name}' の列が異なるため '{backup_path.name}' に退避しました")
+            return
+
+        self._keys = set(zip(existing["source_file"], existing["content_hash"]))
+
+    def _backup_path(self):
+        """既存のファイルと重ならない、日時付きの退避先のパスを返す（例: summary.csv.20250510-103000.bak）"""
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        backup_path = self.csv_path.with_name(f"{self.csv_path.name}.{stamp}.bak")
+        count = 1
+        while backup_path.exists():
+            backup_path = self.csv_path.with_name(f"{self.csv_path.name}.{stamp}-{count}.bak")
+            count += 1
+        return backup_path
+
+    def contains(self, source_file, content_hash):
+        """同じファイル名・同じ内容のOCR結果が分析済みかどうかを返す"""
+        return (source_file, content_hash) in self._keys
+
+    def append(self, rows):
+        """分析結果の行を summary.csv に追記する
+
+        :param rows: source_file, content_hash と各項目を持つ辞書のリスト
+        :return: 追記した行数
+        """
+        rows = [row for row in rows if not self.contains(row["source_file"], row["content_hash"])]
+        if not rows:
+            return 0
+
+        df = pd.DataFrame(rows).reindex(columns=COLUMNS)
+        write_header = not self.csv_path.exists()
+        df.to_csv(self.csv_path, mode="a", header=write_header, index=False, encoding="utf-8")
+
+        self._keys.update((row["source_file"], row["content_hash"]) for row in rows)
+        return len(rows)
+
+    def write_excel(self, excel_path):
+        """summary.csv から summary.xlsx を作成する
+
+        内容が変更されたOCR結果は、最後に追記した分析結果だけを残します。
+        """
+        df = pd.read_csv(self.csv_path, dtype=str, keep_default_na=False, encoding="utf-8")
+        df = df.drop_duplicates(subset="source_file", keep="last")
+        df.to_excel(excel_path, index=False)
+        return len(df)
@@ -10,15 +10,26 @@ Google Cloud Vision APIを使用したレシート画像分析サンプル
 import base64
 import json
 import os
+import sys
 from pathlib import Path
 
-import requests
 from dotenv import load_dotenv
 
+# リポジトリ直下の shared パッケージを読み込めるようにする
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from shared.http_client import default_client
+
+from result_cache import ResultCache, ocr_cache_key
+
 # 環境変数を読み込む
 load_dotenv()
 api_key = os.getenv("GOOGLE_CLOUD_PROJECT_API_KEY")
 
+FEATURES = [{"type": "TEXT_DETECTION", "maxResults": 10000}]
+
+# OCR結果のキャッシュファイル
+CACHE_PATH = Path(__file__).parent / "ocr_cache.sqlite3"
+
 
 def analyze_receipt(image_path):
     """レシート画像を分析し、テキストを抽出する関数"""
@@ -33,7 +44,7 @@ def analyze_receipt(image_path):
         "requests": [
             {
                 "image": {"content": img_data},
-                "features": [{"type": "TEXT_DETECTION", "maxResults": 10000}],
+                "features": FEATURES,
                 "imageContext": {},
             }
         ],
@@ -41,7 +52,7 @@ def analyze_receipt(image_path):
     }
 
     data = json.dumps(request_body)
-    response = requests.post(url, headers=headers, data=data)
+    response = default_client().post(url, headers=headers, data=data, api="vision", operation="images:annotate")
     response.raise_for_status()
     result = response.json()
 
@@ -93,9 +104,15 @@ def main():
     # ディレクトリ内のすべてのファイルを取得
     image_file = data_dir / "img1.jpg"
 
-    # 全ての画像を処理
+    # 全ての画像を処理（処理済みの画像はキャッシュから結果を取得）
     print(f"\n'{image_file}' を分析中...")
-    result = analyze_receipt(str(image_file))
+    with ResultCache(CACHE_PATH) as cache:
+        key = ocr_cache_key(image_file, FEATURES)
+        result = cache.get(key)
+        if result is None:
+            result = analyze_receipt(str(image_file))
+            cache.put(key, result)
+        cache.print_stats()
 
     if result:
         # 結果の保存
@@ -10,19 +10,59 @@ Google Cloud Vision APIを使用したレシート画像分析サンプル
 import base64
 import json
 import os
+import sys
 from pathlib import Path
 
-import requests
 from dotenv import load_dotenv
 
+# リポジトリ直下の shared パッケージを読み込めるようにする
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from shared.http_client import default_client
+
+from result_cache import ResultCache, ocr_cache_key
+
 # 環境変数を読み込む
 load_dotenv()
 api_key = os.getenv("GOOGLE_CLOUD_PROJECT_API_KEY")
 
 
-def analyze_receipt(image_path):
-    """レシート画像を分析し、テキストを抽出する関数"""
-    url = f"https://vision.googleapis.com/v1/images:annotate?key={api_key}"
+# 環境変数 VISION_API_URL で送信先を変更できます（ベンチマーク用のローカルサーバーなど）
+VISION_API_URL = os.getenv("VISION_API_URL", "https://vision.googleapis.com/v1/images:annotate")
+FEATURES = [{"type": "TEXT_DETECTION", "maxResults": 10000}]
+
+# OCR結果のキャッシュファイル
+CACHE_PATH = Path(__file__).parent / "ocr_cache.sqlite3"
+
+
+def format_response(image_response):
+    """images:annotate のレスポンス1件分を保存用の形式に整形する関数"""
+    text_annotations = image_response.get("textAnnotations", [])
+
+    full_text = text_annotations[0].get("description", "") if text_annotations else ""
+
+    blocks = []
+    for text in text_annotations[1:]:
+        block = {
+            "text": text.get("description", ""),
+            "confidence": text.get("confidence", 0),
+            "bounding_box": {"vertices": text.get("boundingPoly", {}).get("vertices", [])},
+        }
+        blocks.append(block)
+
+    formatted_result = {
+        "full_text": full_text,
+        "text_blocks": blocks,
+    }
+
+    return formatted_result
+
+
+def analyze_receipt(image_path, session=None):
+    """レシート画像を分析し、テキストを抽出する関数
+
+    session に HttpClient を渡すと、その接続を使用します（省略時はプロセス内で共有する HttpClient を使用）。
+    """
+    url = f"{VISION_API_URL}?key={api_key}"
     headers = {"Content-Type": "application/json"}
 
     # 画像ファイルの読み込みとBase64エンコード - Path オブジェクトを使用
@@ -33,7 +73,7 @@ def analyze_receipt(image_path):
         "requests": [
             {
                 "image": {"content": img_data},
-                "features": [{"type": "TEXT_DETECTION", "maxResults": 10000}],
+                "features": FEATURES,
                 "imageContext": {},
             }
         ],
@@ -41,30 +81,23 @@ def analyze_receipt(image_path):
     }
 
     data = json.dumps(request_body)
-    response = requests.post(url, headers=headers, data=data)
+    http = session if session is not None else default_client()
+    response = http.post(url, headers=headers, data=data, api="vision", operation="images:annotate")
     response.raise_for_status()
     result = response.json()
 
     # 結果の整形
-    text_annotations = result["responses"][0].get("textAnnotations", [])
+    return format_response(result["responses"][0])
 
-    full_text = text_annotations[0].get("description", "")
 
-    blocks = []
-    for text in text_annotations[1:]:
-        block = {
-            "text": text.get("description", ""),
-            "confidence": text.get("confidence", 0),
-            "bounding_box": {"vertices": text.get("boundingPoly", {}).get("vertices", [])},
-        }
-        blocks.append(block)
-
-    formatted_result = {
-        "full_text": full_text,
-        "text_blocks": blocks,
-    }
-
-    return formatted_result
+def analyze_receipt_cached(image_path, cache, session=None):
+    """キャッシュを確認し、未処理の画像の場合のみ Vision API で分析する関数"""
+    key = ocr_cache_key(image_path, FEATURES)
+    result = cache.get(key)
+    if result is None:
+        result = analyze_receipt(image_path, session)
+        cache.put(key, result)
+    return result
 
 
 def save_results(result, image_path):
@@ -93,19 +126,21 @@ def main():
     # ディレクトリ内のすべてのファイルを取得
     image_files = [f for f in data_dir.iterdir() if f.is_file()]
 
-    # 全ての画像を処理
-    for image_path in image_files:
-        print(f"\n'{image_path}' を分析中...")
-        result = analyze_receipt(str(image_path))
-
-        if result:
-            # 結果の保存
-            save_results(result, str(image_path))
-            print(f"'{image_path}' の処理が完了しました")
-        else:
-            print(f"'{image_path}' の処理に失敗しました")
-
-    print("\nすべての画像の処理が完了しました")
+    # 全ての画像を処理（処理済みの画像はキャッシュから結果を取得）
+    with ResultCache(CACHE_PATH) as cache:
+        for image_path in image_files:
+            print(f"\n'{image_path}' を分析中...")
+            result = analyze_receipt_cached(str(image_path), cache)
+
+            if result:
+                # 結果の保存
+                save_results(result, str(image_path))
+                print(f"'{image_path}' の処理が完了しました")
+            else:
+                print(f"'{image_path}' の処理に失敗しました")
+
+        print("\nすべての画像の処理が完了しました")
+        cache.print_stats()
 
 
 if __name__ == "__main__":
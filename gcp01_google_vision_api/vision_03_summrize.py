@@ -12,6 +12,7 @@
 - Google Gemini APIを使用して分析
 - 結果をJSON形式で出力
 - エラーハンドリング機能付き
+- 定型的なレシートはルールベースで抽出し、判定できない場合のみ Gemini を使用
 
 使用方法：
 1. プログラムを実行
@@ -22,11 +23,19 @@
 
 import json
 import os
+import sys
 from pathlib import Path
 
 import google.generativeai as genai
 from dotenv import load_dotenv
 
+# リポジトリ直下の shared パッケージを読み込めるようにする
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from shared.instrumentation import instrument
+
+from receipt_prompt import build_prompt, compact_ocr_text, print_token_counts
+from receipt_rules import extract_receipt_fields
+
 # 環境変数を読み込む
 load_dotenv()
 
@@ -42,27 +51,8 @@ def analyze_receipt_json(json_path):
         with open(json_path, "r", encoding="utf-8") as file:
             ocr_data = json.load(file)
 
-        # OCR結果からテキストを取得
-        if "text" in ocr_data:
-            text_content = ocr_data["text"]
-        else:
-            text_content = json.dumps(ocr_data)
-
-        prompt = """
-        このレシートから以下の情報を抽出してください：
-        1. 登録番号（登録番号もしくは事業者登録番号）
-        2. 購入店名
-        3. 総支払額
-        4. 消費税額
-
-        以下の形式でJSON形式で返してください：
-        {
-            "登録番号": "番号",
-            "購入店": "店名",
-            "総支払額": "金額",
-            "消費税額": "金額"
-        }
-        """
+        # OCR結果から、分析に必要なテキストだけを取得（座標や信頼度は送信しない）
+        text_content = compact_ocr_text(ocr_data)
 
         # Gemini APIを使用して分析
         model = genai.GenerativeModel(
@@ -72,7 +62,11 @@ def analyze_receipt_json(json_path):
                 "response_mime_type": "application/json",
             },
         )
-        response = model.generate_content(prompt + "\n\nOCRのテキスト結果:\n" + text_content)
+        prompt = build_prompt(text_content)
+        with instrument("gemini", "generateContent") as call:
+            call.bytes_sent = len(prompt.encode("utf-8"))
+            response = model.generate_content(prompt)
+            call.bytes_received = len(response.text.encode("utf-8"))
 
         return response.text
     except FileNotFoundError:
@@ -81,6 +75,23 @@ def analyze_receipt_json(json_path):
         return f"エラーが発生しました: {str(e)}"
 
 
+def analyze_receipt_json_fast(json_path):
+    """ルールベースの抽出を先に試し、判定できない項目がある場合のみ Gemini で分析する関数"""
+    try:
+        with open(json_path, "r", encoding="utf-8") as file:
+            ocr_data = json.load(file)
+    except FileNotFoundError:
+        return f"エラー: ファイル '{json_path}' が見つかりません"
+
+    fields, missing = extract_receipt_fields(ocr_data)
+    if not missing:
+        print("ルールベースの抽出で全ての項目を判定しました")
+        return json.dumps(fields, ensure_ascii=False, indent=2)
+
+    print(f"判定できなかった項目があるため Gemini で分析します: {', '.join(missing)}")
+    return analyze_receipt_json(json_path)
+
+
 def main():
     print("レシート分析プログラム (OCR結果JSON版)")
 
@@ -91,10 +102,14 @@ def main():
         print(f"エラー: ファイル '{json_path}' が見つかりません")
         return
 
-    result = analyze_receipt_json(json_path)
+    result = analyze_receipt_json_fast(json_path)
     print("\n分析結果:")
     print(result)
 
+    # OCR結果全体を送信した場合とのトークン数の比較
+    with open(json_path, "r", encoding="utf-8") as file:
+        print_token_counts("gemini-1.5-pro", json.load(file))
+
 
 if __name__ == "__main__":
     main()
@@ -12,6 +12,11 @@
 - Google Gemini APIを使用して分析
 - 結果をJSON形式で出力
 - エラーハンドリング機能付き
+- 1つの ReceiptAnalyzer を使い回し、複数のOCR結果を並行して分析
+- 分析済みのOCR結果は Gemini を呼び出さずにキャッシュから取得
+- 構造化出力モード（スキーマ指定・temperature 0）で抽出し、不正な応答のみ再試行
+- 複数のレシートを1回のリクエストにまとめて分析（パッキングモード）
+- 分析済みのレシートを飛ばし、新しい分析結果だけを summary.csv に追記（追記モード）
 
 使用方法：
 1. プログラムを実行
@@ -20,14 +25,21 @@
 4. 'exit'と入力して終了
 """
 
-import json
 import os
+import sys
 from pathlib import Path
 
 import google.generativeai as genai
 import pandas as pd
 from dotenv import load_dotenv
 
+# リポジトリ直下の shared パッケージを読み込めるようにする（receipt_analyzer が使用）
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from receipt_analyzer import CACHE_PATH, ReceiptAnalyzer, analyze_files_concurrently, analyze_files_packed
+from result_cache import ResultCache, file_sha256
+from summary_store import IncrementalSummaryWriter
+
 # 環境変数を読み込む
 load_dotenv()
 
@@ -35,61 +47,60 @@ load_dotenv()
 api_key = os.getenv("GOOGLE_CLOUD_PROJECT_API_KEY")
 genai.configure(api_key=api_key)
 
+# 複数のレシートを1回のリクエストにまとめて分析するかどうか
+USE_PACKING = True
+
+# 分析済みのOCR結果を飛ばし、新しい分析結果だけを summary.csv に追記するかどうか
+INCREMENTAL = True
+
+# 追記モードで、summary.csv から summary.xlsx を作り直すかどうか
+REGENERATE_EXCEL = True
+
+
+def analyze_json_files(json_files):
+    """OCR結果のJSONファイルを分析し、(ファイルパス, 結果) のリストを返す関数
+
+    分析済みのOCR結果はキャッシュから取得します。
+    """
+    with ResultCache(CACHE_PATH) as cache:
+        analyzer = ReceiptAnalyzer(cache=cache, structured=True)
+        analyze_files = analyze_files_packed if USE_PACKING else analyze_files_concurrently
+        analyzed = analyze_files(analyzer, json_files)
+        cache.print_stats()
+    return analyzed
 
-def analyze_receipt_json(json_path):
-    """OCR結果のJSONからレシートの情報を抽出する関数"""
-    try:
-        # JSONファイルを読み込む
-        with open(json_path, "r", encoding="utf-8") as file:
-            ocr_data = json.load(file)
-
-        # OCR結果からテキストを取得
-        if "text" in ocr_data:
-            text_content = ocr_data["text"]
-        else:
-            text_content = json.dumps(ocr_data)
-
-        prompt = """
-        このレシートから以下の情報を抽出してください：
-        1. 登録番号（登録番号もしくは事業者登録番号）
-        2. 購入店名
-        3. 総支払額
-        4. 消費税額
-
-        以下の形式でJSON形式で返してください：
-        {
-            "登録番号": "番号",
-            "購入店": "店名",
-            "総支払額": "金額",
-            "消費税額": "金額"
-        }
-        """
-
-        # Gemini APIを使用して分析
-        model = genai.GenerativeModel(
-            "gemini-1.5-pro",
-            generation_config={
-                "temperature": 0.7,
-                "response_mime_type": "application/json",
-            },
-        )
-        response = model.generate_content(prompt + "\n\nOCRのテキスト結果:\n" + text_content)
-
-        # JSON文字列を一度Pythonオブジェクトに変換し、再度日本語で整形されたJSON文字列に変換
-        result_dict = json.loads(response.text)
-        return json.dumps(result_dict, ensure_ascii=False, indent=2)
-    except FileNotFoundError:
-        return f"エラー: ファイル '{json_path}' が見つかりません"
-    except Exception as e:
-        return f"エラーが発生しました: {str(e)}"
+
+def update_summary_incrementally(summary_dir, json_files):
+    """新しく追加・変更されたOCR結果だけを分析し、summary.csv に追記する関数"""
+    writer = IncrementalSummaryWriter(summary_dir / "summary.csv")
+
+    # ファイル名と内容のハッシュが一致するOCR結果は分析済みとして飛ばす
+    hashes = {json_file: file_sha256(json_file) for json_file in json_files}
+    new_files = [json_file for json_file in json_files if not writer.contains(json_file.name, hashes[json_file])]
+    print(f"分析済みのレシート数: {len(json_files) - len(new_files)}, 新しいレシート数: {len(new_files)}")
+
+    rows = [
+        {"source_file": json_file.name, "content_hash": hashes[json_file], **result_dict}
+        for json_file, result_dict in analyze_json_files(new_files)
+        if result_dict is not None
+    ]
+    appended = writer.append(rows)
+    print(f"summary.csv に追記したレシート数: {appended}")
+
+    if REGENERATE_EXCEL and writer.csv_path.exists():
+        count = writer.write_excel(summary_dir / "summary.xlsx")
+        print(f"summary.xlsx を作成しました（{count}件）")
 
 
 def main():
     print("レシート分析プログラム (OCR結果JSON版)")
 
-    # まず、summaryディレクトリ内のファイルを削除
     summary_dir = Path(__file__).parent / "summary"
-    if summary_dir.exists():
+    if INCREMENTAL:
+        # 追記モードでは既存の summary.csv を残す
+        summary_dir.mkdir(exist_ok=True)
+    elif summary_dir.exists():
+        # まず、summaryディレクトリ内のファイルを削除
         for file in summary_dir.iterdir():
             file.unlink()
     else:
@@ -104,19 +115,13 @@ def main():
         print(f"エラー: ディレクトリ '{ocr_dir}' が見つからないか、ディレクトリではありません")
         return
 
-    # ディレクトリ内のすべてのJSONファイルを処理
-    results = []
-    for json_file in ocr_dir.glob("*.json"):
-        result_str = analyze_receipt_json(json_file)
-        try:
-            # JSON文字列をPythonの辞書オブジェクトに変換
-            result_dict = json.loads(result_str)
-            results.append(result_dict)
-        except json.JSONDecodeError as e:
-            print(
-                f"警告: ファイル '{json_file.name}' の解析結果をJSONとして解析できませんでした: {e}"
-            )
-            print(f"受け取った文字列: {result_str}")
+    json_files = sorted(ocr_dir.glob("*.json"))
+    if INCREMENTAL:
+        update_summary_incrementally(summary_dir, json_files)
+        return
+
+    # ディレクトリ内のすべてのJSONファイルを並行して処理（結果はファイル名の順に並べる）
+    results = [result_dict for _, result_dict in analyze_json_files(json_files) if result_dict is not None]
 
     # 解析結果が空でないか確認
     if not results:
@@ -0,0 +1,157 @@
+"""
+Google Cloud Vision APIを使用したレシート画像の一括分析サンプル（バッチ送信版）
+
+このスクリプトは以下の機能を提供します：
+- 複数のレシート画像を1回の images:annotate リクエストにまとめて送信
+- 1リクエストあたりの画像枚数と Base64 ペイロードの合計サイズに上限を設定
+- レスポンスの responses 配列を画像ごとの結果に分配してJSONファイル保存
+- 一部の画像でエラーが発生した場合は、より小さなバッチに分割して再送信
+
+vision_02_read_all.py が画像1枚ごとにリクエストを送るのに対し、
+このスクリプトはリクエスト回数を減らすことで、大量の画像を処理する際の待ち時間を短縮します。
+"""
+
+import base64
+import json
+import sys
+from pathlib import Path
+
+import requests
+
+# リポジトリ直下の shared パッケージを読み込めるようにする
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from shared.http_client import default_client
+
+from vision_02_read_all import FEATURES, VISION_API_URL, api_key, format_response, save_results
+
+# Vision API の1リクエストあたりの画像数の上限
+MAX_IMAGES_PER_REQUEST = 16
+
+# リクエストサイズの上限（10MB）に余裕を持たせた Base64 ペイロードの合計サイズ
+MAX_PAYLOAD_BYTES = 8 * 1024 * 1024
+
+
+def estimate_base64_size(image_path):
+    """画像ファイルを Base64 エンコードした際のサイズ（バイト数）を見積もる関数"""
+    file_size = Path(image_path).stat().st_size
+    return 4 * ((file_size + 2) // 3)
+
+
+def make_batches(image_paths, max_images=MAX_IMAGES_PER_REQUEST, max_payload_bytes=MAX_PAYLOAD_BYTES):
+    """画像のリストを、枚数とペイロードサイズの上限に収まるバッチに分割する関数
+
+    上限サイズを単独で超える画像は、その画像だけのバッチになります。
+    """
+    batch = []
+    batch_size = 0
+    for image_path in image_paths:
+        size = estimate_base64_size(image_path)
+        if batch and (len(batch) >= max_images or batch_size + size > max_payload_bytes):
+            yield batch
+            batch = []
+            batch_size = 0
+        batch.append(image_path)
+        batch_size += size
+
+    if batch:
+        yield batch
+
+
+def annotate_batch(image_paths):
+    """複数の画像を1回のリクエストで送信し、responses 配列を返す関数"""
+    url = f"{VISION_API_URL}?key={api_key}"
+    headers = {"Content-Type": "application/json"}
+
+    request_body = {
+        "requests": [
+            {
+                "image": {"content": base64.b64encode(Path(image_path).read_bytes()).decode("utf-8")},
+                "features": FEATURES,
+                "imageContext": {},
+            }
+            for image_path in image_paths
+        ],
+        "parent": "",
+    }
+
+    response = default_client().post(
+        url, headers=headers, data=json.dumps(request_body), api="vision", operation="images:annotate"
+    )
+    response.raise_for_status()
+    return response.json().get("responses", [])
+
+
+def _retry_in_smaller_batches(image_paths):
+    """失敗した画像を、元のバッチより小さな単位に分けて再送信する関数"""
+    if len(image_paths) == 1:
+        return analyze_receipts_batch(image_paths)
+
+    middle = len(image_paths) // 2
+    return analyze_receipts_batch(image_paths[:middle]) + analyze_receipts_batch(image_paths[middle:])
+
+
+def analyze_receipts_batch(image_paths):
+    """複数のレシート画像をまとめて分析し、入力と同じ順序で結果のリストを返す関数
+
+    処理に失敗した画像の結果は None になります。
+    """
+    image_paths = list(image_paths)
+
+    try:
+        responses = annotate_batch(image_paths)
+    except requests.RequestException as e:
+        if len(image_paths) == 1:
+            print(f"エラー: '{image_paths[0]}' の分析に失敗しました: {e}")
+            return [None]
+        # バッチ全体が拒否された場合や通信エラー・タイムアウトの場合は、半分に分割して再送信
+        print(f"警告: {len(image_paths)}枚のバッチが失敗したため、分割して再送信します: {e}")
+        return _retry_in_smaller_batches(image_paths)
+
+    results = [None] * len(image_paths)
+    failed_indexes = []
+    for i, image_path in enumerate(image_paths):
+        image_response = responses[i] if i < len(responses) else {"error": {"message": "レスポンスがありません"}}
+        if "error" in image_response:
+            if len(image_paths) == 1:
+                print(f"エラー: '{image_path}' の分析に失敗しました: {image_response['error'].get('message')}")
+            failed_indexes.append(i)
+        else:
+            results[i] = format_response(image_response)
+
+    # 一部の画像だけが失敗した場合は、その画像だけを小さなバッチで再送信
+    if failed_indexes and len(image_paths) > 1:
+        retried = _retry_in_smaller_batches([image_paths[i] for i in failed_indexes])
+        for i, result in zip(failed_indexes, retried):
+            results[i] = result
+
+    return results
+
+
+def main():
+    print("Google Cloud Vision API レシート分析サンプル（バッチ送信版）")
+
+    # データディレクトリのパスを設定
+    current_dir = Path(__file__)
+    data_dir = current_dir.parent / "data"
+
+    # ディレクトリ内のすべてのファイルを取得
+    image_files = [f for f in data_dir.iterdir() if f.is_file()]
+
+    # 画像をバッチにまとめて処理
+    for batch in make_batches(image_files):
+        print(f"\n{len(batch)}枚の画像をまとめて分析中...")
+        results = analyze_receipts_batch(batch)
+
+        for image_path, result in zip(batch, results):
+            if result:
+                # 結果の保存
+                save_results(result, str(image_path))
+                print(f"'{image_path}' の処理が完了しました")
+            else:
+                print(f"'{image_path}' の処理に失敗しました")
+
+    print("\nすべての画像の処理が完了しました")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Google Cloud Vision APIを使用したレシート画像の一括分析サンプル（並行処理版）
+
+このスクリプトは以下の機能を提供します：
+- スレッドプールを使用した複数画像の並行分析
+- 同時に送信するリクエスト数（同時実行数）の上限設定
+- keep-alive を有効にした HttpClient（shared/http_client.py）の共有による接続の使い回し
+- 入力した画像の順序どおりに結果を保存
+
+vision_02_read_all.py が画像を1枚ずつ順番に処理するのに対し、
+このスクリプトは通信の待ち時間を重ね合わせることで、全体の処理時間を短縮します。
+"""
+
+import sys
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# リポジトリ直下の shared パッケージを読み込めるようにする
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from shared.http_client import HttpClient
+
+from vision_02_read_all import analyze_receipt, save_results
+
+# 同時に送信するリクエスト数の上限
+CONCURRENCY = 16
+
+
+def create_session(pool_size=CONCURRENCY):
+    """同時実行数に合わせたコネクションプールを持つ HttpClient を作成する関数"""
+    return HttpClient(pool_size=pool_size)
+
+
+def _collect(image_path, future):
+    """Future から結果を取り出す関数（失敗した場合は None を返す）"""
+    try:
+        return image_path, future.result()
+    except Exception as e:
+        print(f"エラー: '{image_path}' の分析に失敗しました: {e}")
+        return image_path, None
+
+
+def analyze_receipts_concurrently(image_paths, concurrency=CONCURRENCY):
+    """複数のレシート画像を並行して分析し、入力と同じ順序で (画像パス, 結果) を返すジェネレーター
+
+    未完了のタスクは同時実行数の2倍までに抑えるため、大量の画像を渡してもメモリ使用量は一定です。
+    """
+    with create_session(concurrency) as session, ThreadPoolExecutor(max_workers=concurrency) as executor:
+        pending = deque()
+        for image_path in image_paths:
+            pending.append((image_path, executor.submit(analyze_receipt, str(image_path), session)))
+
+            # 先頭のタスクから順に結果を返し、未完了のタスク数を制限する
+            if len(pending) >= concurrency * 2:
+                yield _collect(*pending.popleft())
+
+        while pending:
+            yield _collect(*pending.popleft())
+
+
+def main():
+    print("Google Cloud Vision API レシート分析サンプル（並行処理版）")
+
+    # データディレクトリのパスを設定
+    current_dir = Path(__file__)
+    data_dir = current_dir.parent / "data"
+
+    # ディレクトリ内のすべてのファイルを取得
+    image_files = [f for f in data_dir.iterdir() if f.is_file()]
+
+    # 全ての画像を並行して処理
+    print(f"\n{len(image_files)}枚の画像を同時実行数 {CONCURRENCY} で分析中...")
+    start = time.perf_counter()
+    for image_path, result in analyze_receipts_concurrently(image_files):
+        if result:
+            # 結果の保存
+            save_results(result, str(image_path))
+            print(f"'{image_path}' の処理が完了しました")
+        else:
+            print(f"'{image_path}' の処理に失敗しました")
+
+    print(f"\nすべての画像の処理が完了しました（{time.perf_counter() - start:.1f}秒）")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Google Cloud Vision APIを使用したレシート画像の一括分析サンプル（ストリーミング送信版）
+
+このスクリプトは以下の機能を提供します：
+- 画像ファイルを少しずつ読み込みながら Base64 エンコードし、そのままリクエスト本文として送信
+- 送信前に本文の長さを計算し、Content-Length ヘッダー付きで送信
+- 結果のJSONファイル保存
+
+vision_02_read_all.py は画像全体の Base64 文字列と JSON 文字列をメモリ上に作成してから送信するため、
+大きな画像では画像サイズの数倍のメモリを使用します。
+このスクリプトでは、メモリ上に保持するのは読み込み中の一部分だけなので、
+画像の大きさに関係なくメモリ使用量がほぼ一定になります。
+"""
+
+import base64
+import json
+import sys
+from pathlib import Path
+
+# リポジトリ直下の shared パッケージを読み込めるようにする
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from shared.http_client import default_client
+
+from vision_02_read_all import FEATURES, VISION_API_URL, api_key, format_response, save_results
+
+# 一度に読み込むバイト数（Base64 の区切りに合わせるため 3 の倍数にする）
+READ_CHUNK_SIZE = 3 * 64 * 1024
+
+
+class StreamingAnnotateBody:
+    """images:annotate のリクエスト本文を、画像を読み込みながら少しずつ生成するクラス
+
+    requests に data として渡すと、__len__ で Content-Length を設定し、
+    __iter__ で生成したバイト列を順に送信します。
+    """
+
+    def __init__(self, image_path, features=FEATURES, chunk_size=READ_CHUNK_SIZE):
+        if chunk_size % 3 != 0:
+            raise ValueError("chunk_size は 3 の倍数で指定してください")
+
+        self.image_path = Path(image_path)
+        self.chunk_size = chunk_size
+
+        # 画像データの前後に入る JSON の文字列
+        self._prefix = b'{"requests": [{"image": {"content": "'
+        self._suffix = (
+            '"}, "features": ' + json.dumps(features) + ', "imageContext": {}}], "parent": ""}'
+        ).encode("utf-8")
+
+    def __len__(self):
+        """送信する本文全体のバイト数を、画像を読み込まずに計算する"""
+        file_size = self.image_path.stat().st_size
+        encoded_size = 4 * ((file_size + 2) // 3)
+        return len(self._prefix) + encoded_size + len(self._suffix)
+
+    def __iter__(self):
+        """本文を先頭から順に、少しずつ生成する"""
+        yield self._prefix
+        with open(self.image_path, "rb") as file:
+            for chunk in iter(lambda: file.read(self.chunk_size), b""):
+                yield base64.b64encode(chunk)
+        yield self._suffix
+
+
+def analyze_receipt_streaming(image_path, session=None):
+    """レシート画像をストリーミング送信で分析し、テキストを抽出する関数"""
+    url = f"{VISION_API_URL}?key={api_key}"
+    headers = {"Content-Type": "application/json"}
+
+    http = session if session is not None else default_client()
+    response = http.post(
+        url, headers=headers, data=StreamingAnnotateBody(image_path), api="vision", operation="images:annotate"
+    )
+    response.raise_for_status()
+    result = response.json()
+
+    # 結果の整形
+    return format_response(result["responses"][0])
+
+
+def main():
+    print("Google Cloud Vision API レシート分析サンプル（ストリーミング送信版）")
+
+    # データディレクトリのパスを設定
+    current_dir = Path(__file__)
+    data_dir = current_dir.parent / "data"
+
+    # ディレクトリ内のすべてのファイルを取得
+    image_files = [f for f in data_dir.iterdir() if f.is_file()]
+
+    # 全ての画像を処理
+    for image_path in image_files:
+        print(f"\n'{image_path}' を分析中...")
+        result = analyze_receipt_streaming(image_path)
+
+        if result:
+            # 結果の保存
+            save_results(result, str(image_path))
+            print(f"'{image_path}' の処理が完了しました")
+        else:
+            print(f"'{image_path}' の処理に失敗しました")
+
+    print("\nすべての画像の処理が完了しました")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""
+Google Cloud Vision APIに送信する前にレシート画像を縮小・再圧縮するサンプル
+
+このスクリプトは以下の機能を提供します：
+- 長辺のピクセル数・JPEG品質・グレースケール変換を指定した画像の前処理
+- プロセスプールを使用した複数画像の並列前処理
+- 前処理によって削減できたファイルサイズのレポート
+- 一部の画像について、保存済みの元画像の OCR 結果と前処理後の画像の OCR 結果の差分を表示
+- 前処理後の画像の分析と結果のJSONファイル保存
+
+スマートフォンで撮影した画像は OCR に必要な解像度より大きいことが多いため、
+送信前に縮小することで通信量と待ち時間を減らせます。
+
+必要なライブラリ: Pillow
+"""
+
+import difflib
+import hashlib
+import json
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from pathlib import Path
+
+from PIL import Image, ImageOps
+
+from vision_02_read_all import analyze_receipt, save_results
+
+# 前処理の設定
+MAX_LONG_EDGE = 1600  # 長辺の最大ピクセル数
+JPEG_QUALITY = 80  # JPEG の品質（1〜95）
+GRAYSCALE = True  # グレースケールに変換するかどうか
+
+# OCR 結果の差分を確認する画像の枚数
+SAMPLE_SIZE = 1
+
+
+def preprocessed_name(image_path, base_dir=None):
+    """前処理後の画像のファイル名を返す関数
+
+    別のサブフォルダにある同じ名前の画像や、拡張子だけが異なる画像が同じファイルに保存されないよう、
+    base_dir からの相対パス（base_dir を指定しない場合は絶対パス）の短いハッシュを名前に含めます。
+    """
+    image_path = Path(image_path)
+    relative = image_path.relative_to(base_dir) if base_dir is not None else image_path.resolve()
+    digest = hashlib.sha1(relative.as_posix().encode("utf-8")).hexdigest()[:8]
+    return f"{image_path.stem}-{digest}.jpg"
+
+
+def preprocess_image(
+    image_path, output_dir, base_dir=None, max_long_edge=MAX_LONG_EDGE, quality=JPEG_QUALITY, grayscale=GRAYSCALE
+):
+    """画像を縮小・再圧縮して保存し、(元画像パス, 保存先パス, 元サイズ, 処理後サイズ) を返す関数"""
+    image_path = Path(image_path)
+    output_path = Path(output_dir) / preprocessed_name(image_path, base_dir)
+
+    with Image.open(image_path) as image:
+        # スマートフォンの画像は EXIF の向き情報に従って回転させておく
+        image = ImageOps.exif_transpose(image)
+        image = image.convert("L" if grayscale else "RGB")
+        # 長辺が指定サイズを超える場合のみ、縦横比を保って縮小する
+        image.thumbnail((max_long_edge, max_long_edge), Image.Resampling.LANCZOS)
+        image.save(output_path, "JPEG", quality=quality, optimize=True)
+
+    return image_path, output_path, image_path.stat().st_size, output_path.stat().st_size
+
+
+def preprocess_images(image_paths, output_dir, max_workers=None, base_dir=None, **options):
+    """複数の画像をプロセスプールで並列に前処理する関数
+
+    :param base_dir: 保存先のファイル名に含める相対パスの基準のディレクトリ（preprocessed_name を参照）
+    :param options: preprocess_image に渡す前処理の設定（max_long_edge, quality, grayscale）
+    :return: preprocess_image の戻り値のリスト（入力と同じ順序）
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(exist_ok=True)
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        return list(
+            executor.map(partial(preprocess_image, output_dir=output_dir, base_dir=base_dir, **options), image_paths)
+        )
+
+
+def print_size_report(processed):
+    """前処理によるファイルサイズの削減量を表示する関数"""
+    print("\nファイルサイズの比較:")
+    total_before = 0
+    total_after = 0
+    for image_path, _, before, after in processed:
+        total_before += before
+        total_after += after
+        print(f"  {image_path.name}: {before / 1024:.0f}KB -> {after / 1024:.0f}KB ({before / max(after, 1):.1f}倍)")
+
+    saved = total_before - total_after
+    print(
+        f"合計: {total_before / 1024:.0f}KB -> {total_after / 1024:.0f}KB "
+        f"（{saved / 1024:.0f}KB 削減, {total_before / max(total_after, 1):.1f}倍）"
+    )
+
+
+def load_saved_result(image_path):
+    """save_results で保存済みの画像の OCR 結果を読み込む関数（保存されていない場合は None）"""
+    json_path = Path(__file__).parent / "ocr_results" / f"{Path(image_path).stem}.json"
+    if not json_path.exists():
+        return None
+    return json.loads(json_path.read_text(encoding="utf-8"))
+
+
+def compare_ocr(original_path, original_result, preprocessed_result):
+    """元画像と前処理後の画像の OCR 結果を比較し、テキストの一致率を返す関数
+
+    API の呼び出しを増やさないよう、どちらも取得済みの OCR 結果を受け取ります。
+    """
+    original_text = original_result["full_text"]
+    preprocessed_text = preprocessed_result["full_text"]
+
+    ratio = difflib.SequenceMatcher(None, original_text, preprocessed_text).ratio()
+    print(f"\n'{Path(original_path).name}' の OCR 結果の一致率: {ratio:.1%}")
+
+    diff = difflib.unified_diff(
+        original_text.splitlines(),
+        preprocessed_text.splitlines(),
+        fromfile="元画像",
+        tofile="前処理後",
+        lineterm="",
+    )
+    for line in diff:
+        print(f"  {line}")
+
+    return ratio
+
+
+def main():
+    print("レシート画像の前処理サンプル")
+
+    # データディレクトリのパスを設定
+    current_dir = Path(__file__)
+    data_dir = current_dir.parent / "data"
+    output_dir = current_dir.parent / "data_preprocessed"
+
+    # ディレクトリ内のすべてのファイルを取得
+    image_files = [f for f in data_dir.iterdir() if f.is_file()]
+
+    # 全ての画像を並列に前処理
+    print(f"\n{len(image_files)}枚の画像を前処理中（長辺 {MAX_LONG_EDGE}px, 品質 {JPEG_QUALITY}）...")
+    processed = preprocess_images(image_files, output_dir, base_dir=data_dir)
+    print_size_report(processed)
+
+    # 前処理後の画像を分析
+    for i, (image_path, output_path, _, _) in enumerate(processed):
+        # 一部の画像は、保存済みの元画像の OCR 結果と比較して前処理による影響を確認する
+        # （上書きされる前に読み込んでおく）
+        original_result = load_saved_result(image_path) if i < SAMPLE_SIZE else None
+
+        print(f"\n'{output_path}' を分析中...")
+        result = analyze_receipt(str(output_path))
+
+        if result and original_result:
+            compare_ocr(image_path, original_result, result)
+        elif result and i < SAMPLE_SIZE:
+            print(f"'{image_path.name}' の元画像の OCR 結果が保存されていないため、比較を省略します")
+
+        if result:
+            # 結果の保存（元画像と同じ名前で保存）
+            save_results(result, str(image_path))
+            print(f"'{image_path}' の処理が完了しました")
+        else:
+            print(f"'{image_path}' の処理に失敗しました")
+
+    print("\nすべての画像の処理が完了しました")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""
+OCR結果のテキストブロックを Parquet 形式でまとめて保存するサンプル
+
+このスクリプトは以下の機能を提供します：
+- OCR結果の text_blocks を、1ブロック1行の表形式（画像ID・テキスト・信頼度・頂点座標）に変換
+- 複数画像分のブロックをまとめて Parquet ファイルに追記保存
+- 保存した Parquet ファイルの一括読み込み
+- 既存の ocr_results/*.json の Parquet 形式への変換
+
+画像ごとのJSONファイルを大量に読み込むのに比べ、
+数百万件のブロックでも pandas で短時間に読み込んで集計できます。
+
+必要なライブラリ: pandas, pyarrow
+"""
+
+import json
+import re
+from pathlib import Path
+
+import pandas as pd
+
+# 1つの Parquet ファイルにまとめるブロック数の目安
+ROWS_PER_FILE = 100_000
+
+# バウンディングボックスの頂点の数
+VERTEX_COUNT = 4
+
+# Parquet ファイル名の番号を取り出すパターン
+PART_PATTERN = re.compile(r"part-(\d+)\.parquet$")
+
+BLOCK_COLUMNS = ["image_id", "block_index", "text", "confidence"] + [
+    f"{axis}{i}" for i in range(VERTEX_COUNT) for axis in ("x", "y")
+]
+
+
+def blocks_to_rows(image_id, result):
+    """OCR結果の text_blocks を、1ブロック1行の辞書のリストに変換する関数
+
+    頂点座標は x0, y0, ..., x3, y3 の列に展開します。
+    Vision API は 0 の座標を省略するため、欠けている値は 0 とします。
+    """
+    rows = []
+    for i, block in enumerate(result.get("text_blocks", [])):
+        row = {
+            "image_id": image_id,
+            "block_index": i,
+            "text": block.get("text", ""),
+            "confidence": float(block.get("confidence", 0)),
+        }
+        vertices = block.get("bounding_box", {}).get("vertices", [])
+        for j in range(VERTEX_COUNT):
+            vertex = vertices[j] if j < len(vertices) else {}
+            row[f"x{j}"] = vertex.get("x", 0)
+            row[f"y{j}"] = vertex.get("y", 0)
+        rows.append(row)
+    return rows
+
+
+def rows_to_frame(rows):
+    """ブロックの行のリストを、列の型を揃えた DataFrame に変換する関数"""
+    df = pd.DataFrame(rows, columns=BLOCK_COLUMNS)
+    coordinate_columns = BLOCK_COLUMNS[4:]
+    return df.astype({"block_index": "int32", "confidence": "float32", **{c: "int32" for c in coordinate_columns}})
+
+
+class ParquetBlockSink:
+    """OCR結果のテキストブロックを Parquet ファイルに追記保存するクラス
+
+    ブロックはメモリ上にためておき、rows_per_file 件に達するごとに
+    output_dir に part-00000.parquet, part-00001.parquet, ... として書き出します。
+    既存のファイルがある場合は、最も大きい番号の続きから書き出します。
+    """
+
+    def __init__(self, output_dir, rows_per_file=ROWS_PER_FILE):
+        self.output_dir = Path(output_dir)
+        self.output_dir.mkdir(exist_ok=True)
+        self.rows_per_file = rows_per_file
+        self._rows = []
+        self._next_part = max(self._part_numbers(), default=-1) + 1
+
+    def _part_numbers(self):
+        """output_dir にある Parquet ファイルの番号のリストを返す"""
+        numbers = []
+        for path in self.output_dir.glob("part-*.parquet"):
+            match = PART_PATTERN.search(path.name)
+            if match:
+                numbers.append(int(match.group(1)))
+        return numbers
+
+    def written_image_ids(self):
+        """output_dir の Parquet ファイルに保存済みの画像IDの集合を返す"""
+        if not self._part_numbers():
+            return set()
+        return set(pd.read_parquet(self.output_dir, columns=["image_id"])["image_id"])
+
+    def add(self, image_id, result):
+        """1画像分のOCR結果を追加する"""
+        self._rows.extend(blocks_to_rows(image_id, result))
+        if len(self._rows) >= self.rows_per_file:
+            self.flush()
+
+    def flush(self):
+        """ためているブロックをファイルに書き出す"""
+        if not self._rows:
+            return None
+
+        output_path = self.output_dir / f"part-{self._next_part:05d}.parquet"
+        rows_to_frame(self._rows).to_parquet(output_path, index=False)
+        self._next_part += 1
+        self._rows = []
+        return output_path
+
+    def close(self):
+        """残りのブロックを書き出して終了する"""
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def load_blocks(output_dir):
+    """保存した全ての Parquet ファイルを読み込み、1つの DataFrame として返す関数
+
+    Parquet ファイルがまだない場合は、同じ列を持つ空の DataFrame を返します。
+    """
+    output_dir = Path(output_dir)
+    if not output_dir.is_dir() or not any(output_dir.glob("*.parquet")):
+        return rows_to_frame([])
+    return pd.read_parquet(output_dir)
+
+
+def main():
+    print("OCR結果の Parquet 変換サンプル")
+
+    current_dir = Path(__file__).parent
+    ocr_dir = current_dir / "ocr_results"
+    output_dir = current_dir / "ocr_blocks"
+
+    # ディレクトリが存在するか確認
+    if not ocr_dir.exists() or not ocr_dir.is_dir():
+        print(f"エラー: ディレクトリ '{ocr_dir}' が見つからないか、ディレクトリではありません")
+        return
+
+    # ディレクトリ内のJSONファイルのうち、まだ保存していないものを Parquet に変換
+    json_files = sorted(ocr_dir.glob("*.json"))
+    with ParquetBlockSink(output_dir) as sink:
+        written_ids = sink.written_image_ids()
+        new_files = [json_file for json_file in json_files if json_file.stem not in written_ids]
+        for json_file in new_files:
+            result = json.loads(json_file.read_text(encoding="utf-8"))
+            sink.add(json_file.stem, result)
+
+    print(f"{len(new_files)}件のOCR結果を '{output_dir}' に保存しました（保存済み: {len(json_files) - len(new_files)}件）")
+
+    # 保存したブロックを読み込んで集計
+    df = load_blocks(output_dir)
+    print(f"\n読み込んだブロック数: {len(df)}")
+    print(df.groupby("image_id").agg(blocks=("text", "size"), mean_confidence=("confidence", "mean")))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""
+レシート画像の読み取りから分析結果の保存までを一括で行うパイプラインのサンプル
+
+このスクリプトは以下の機能を提供します：
+- 画像を OCR → テキストの整理 → 情報の抽出 → 保存 の各段階に順に流す処理
+- 段階の間をサイズ上限付きのキューでつなぎ、段階ごとに同時実行数を設定
+- 定型的なレシートはルールベースで抽出し、判定できないものだけを Gemini で分析
+- 分析結果を summary/pipeline_summary.csv に少しずつ追記（処理済みの画像は飛ばす）
+
+vision_02_read_all.py で ocr_results/ に保存してから vision_05 で読み直す代わりに、
+Vision API と Gemini の通信の待ち時間を重ね合わせることで、全体の処理時間を短縮します。
+"""
+
+import queue
+import sys
+import threading
+import time
+from pathlib import Path
+
+# リポジトリ直下の shared パッケージを読み込めるようにする（receipt_analyzer が使用）
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from receipt_analyzer import CACHE_PATH as LLM_CACHE_PATH
+from receipt_analyzer import ReceiptAnalyzer
+from receipt_prompt import compact_ocr_text
+from receipt_rules import extract_receipt_fields
+from result_cache import ResultCache, file_sha256
+from summary_store import IncrementalSummaryWriter
+from vision_02_read_all import CACHE_PATH as OCR_CACHE_PATH
+from vision_02_read_all import analyze_receipt_cached, save_results
+from vision_07_read_all_concurrent import create_session
+
+# 段階ごとの同時実行数
+OCR_WORKERS = 8
+COMPACT_WORKERS = 1
+EXTRACT_WORKERS = 4
+
+# 段階の間のキューに入れておける件数の上限
+QUEUE_SIZE = 32
+
+# 何件ごとに summary/pipeline_summary.csv に追記するか
+SINK_BATCH_SIZE = 10
+
+# OCR結果を ocr_results/ にも保存するかどうか
+SAVE_OCR_RESULTS = True
+
+# キューの終わりを表す印
+_DONE = object()
+
+
+class Stage:
+    """キューから項目を受け取り、処理した結果を次のキューに渡すパイプラインの段階
+
+    :param name: 段階の名前（エラー表示用）
+    :param func: 項目を受け取り、次の段階に渡す項目を返す関数
+    :param workers: 同時実行数（スレッド数）
+    :param input_queue: 項目を受け取るキュー
+    :param output_queue: 処理した項目を渡すキュー
+    """
+
+    def __init__(self, name, func, workers, input_queue, output_queue):
+        self.name = name
+        self.func = func
+        self.input_queue = input_queue
+        self.output_queue = output_queue
+        self._threads = [threading.Thread(target=self._run, daemon=True) for _ in range(workers)]
+        self._remaining = workers
+        self._lock = threading.Lock()
+
+    def start(self):
+        """スレッドを開始する"""
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def _run(self):
+        while True:
+            item = self.input_queue.get()
+            if item is _DONE:
+                # 同じ段階の他のスレッドにも終わりを伝える
+                self.input_queue.put(_DONE)
+                break
+            try:
+                self.output_queue.put(self.func(item))
+            except Exception as e:
+                print(f"エラー: [{self.name}] '{item['image_path'].name}' の処理に失敗しました: {e}")
+
+        # 最後に終了したスレッドが、次の段階に終わりを伝える
+        with self._lock:
+            self._remaining -= 1
+            is_last = self._remaining == 0
+        if is_last:
+            self.output_queue.put(_DONE)
+
+
+def build_pipeline(ocr_cache, analyzer, session):
+    """パイプラインの各段階を作成し、(入力キュー, 出力キュー, 段階のリスト) を返す関数"""
+
+    def ocr(item):
+        item["ocr_data"] = analyze_receipt_cached(str(item["image_path"]), ocr_cache, session)
+        if SAVE_OCR_RESULTS:
+            save_results(item["ocr_data"], str(item["image_path"]))
+        return item
+
+    def compact(item):
+        # ルールベースで判定できたレシートは Gemini に送らない
+        fields, missing = extract_receipt_fields(item["ocr_data"])
+        if missing:
+            item["text"] = compact_ocr_text(item["ocr_data"])
+        else:
+            item["result"] = fields
+        return item
+
+    def extract(item):
+        if "result" not in item:
+            item["result"] = analyzer.analyze_text(item["text"])
+        return item
+
+    queues = [queue.Queue(maxsize=QUEUE_SIZE) for _ in range(4)]
+    stages = [
+        Stage("OCR", ocr, OCR_WORKERS, queues[0], queues[1]),
+        Stage("テキスト整理", compact, COMPACT_WORKERS, queues[1], queues[2]),
+        Stage("情報抽出", extract, EXTRACT_WORKERS, queues[2], queues[3]),
+    ]
+    return queues[0], queues[-1], stages
+
+
+def _feed(input_queue, items):
+    """項目をパイプラインの入力キューに順に入れる（キューがいっぱいの場合は空くまで待つ）"""
+    for item in items:
+        input_queue.put(item)
+    input_queue.put(_DONE)
+
+
+def main():
+    print("レシート分析パイプライン（OCR → テキスト整理 → 情報抽出 → 保存）")
+
+    current_dir = Path(__file__).parent
+    data_dir = current_dir / "data"
+    summary_dir = current_dir / "summary"
+    summary_dir.mkdir(exist_ok=True)
+
+    writer = IncrementalSummaryWriter(summary_dir / "pipeline_summary.csv")
+
+    # 処理済み（ファイル名とハッシュが一致する）の画像は飛ばす
+    items = []
+    for image_path in sorted(f for f in data_dir.iterdir() if f.is_file()):
+        content_hash = file_sha256(image_path)
+        if not writer.contains(image_path.name, content_hash):
+            items.append({"image_path": image_path, "content_hash": content_hash})
+    print(f"新しい画像の数: {len(items)}")
+
+    start = time.perf_counter()
+    processed = 0
+    with ResultCache(OCR_CACHE_PATH) as ocr_cache, ResultCache(LLM_CACHE_PATH) as llm_cache, create_session(
+        OCR_WORKERS
+    ) as session:
+        analyzer = ReceiptAnalyzer(cache=llm_cache, structured=True, use_rules=False)
+        input_queue, output_queue, stages = build_pipeline(ocr_cache, analyzer, session)
+        for stage in stages:
+            stage.start()
+        threading.Thread(target=_feed, args=(input_queue, items), daemon=True).start()
+
+        # 分析が終わったものから順に、まとめて summary に追記する
+        rows = []
+        while (item := output_queue.get()) is not _DONE:
+            rows.append({"source_file": item["image_path"].name, "content_hash": item["content_hash"], **item["result"]})
+            print(f"'{item['image_path'].name}' の分析が完了しました")
+            if len(rows) >= SINK_BATCH_SIZE:
+                processed += writer.append(rows)
+                rows = []
+        processed += writer.append(rows)
+
+        ocr_cache.print_stats()
+        llm_cache.print_stats()
+
+    if processed and writer.csv_path.exists():
+        writer.write_excel(summary_dir / "pipeline_summary.xlsx")
+
+    print(f"\n処理したレシート数: {processed}（{time.perf_counter() - start:.1f}秒）")
+
+
+if __name__ == "__main__":
+    main()
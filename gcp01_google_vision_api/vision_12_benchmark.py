@@ -0,0 +1,194 @@
+"""
+レシート処理の各方式の処理速度を、ローカルのスタブサーバーで比較するベンチマーク
+
+このスクリプトは以下の機能を提供します：
+- Vision API と Gemini API の応答を再現するローカルサーバー（bench_stub_server.py）の起動
+- OCR（1枚ずつ・ストリーミング送信・バッチ送信・並行処理）と
+  Gemini での分析（1件ずつ・並行処理・パッキング）の各方式の実行
+- 方式ごとの処理件数/秒、リクエストの待ち時間（p50, p95）、最大メモリ使用量、送信バイト数の表示
+
+Google の API を呼び出さないため、API キーや利用料金なしで性能の劣化を確認できます。
+各方式は別プロセスで実行し、メモリ使用量が他の方式の影響を受けないようにしています。
+"""
+
+import multiprocessing
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+
+import google.generativeai as genai
+import requests
+
+# リポジトリ直下の shared パッケージを読み込めるようにする（receipt_analyzer が使用）
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from bench_stub_server import StubServer
+from receipt_analyzer import ReceiptAnalyzer
+from vision_02_read_all import analyze_receipt
+from vision_06_read_all_batch import analyze_receipts_batch, make_batches
+from vision_07_read_all_concurrent import analyze_receipts_concurrently
+from vision_08_read_all_streaming import analyze_receipt_streaming
+
+try:
+    import resource
+except ImportError:
+    # Windows では最大メモリ使用量を計測しない
+    resource = None
+
+# ベンチマークの設定
+IMAGE_COUNT = 40  # OCR で処理する画像の枚数（data/ の画像を繰り返し使用）
+RECEIPT_COUNT = 40  # Gemini で分析するレシートの件数
+CONCURRENCY = 8  # 並行処理の同時実行数
+LATENCY = 0.2  # スタブサーバーの平均待ち時間（秒）
+JITTER = 0.05  # スタブサーバーの待ち時間のばらつき（秒）
+ERROR_RATE = 0.0  # スタブサーバーが 503 エラーを返す割合
+
+OCR_MODES = ["ocr_sequential", "ocr_streaming", "ocr_batched", "ocr_concurrent"]
+LLM_MODES = ["llm_sequential", "llm_concurrent", "llm_packed"]
+
+
+def _install_request_timer(durations):
+    """全ての HTTP リクエストの所要時間を durations に記録するようにする
+
+    requests.post も Gemini の REST 通信も requests.Session.send を経由するため、
+    ここで計測すれば全ての方式を同じ条件で比較できます。
+    """
+    original_send = requests.Session.send
+
+    def timed_send(self, request, **kwargs):
+        start = time.perf_counter()
+        try:
+            return original_send(self, request, **kwargs)
+        finally:
+            durations.append(time.perf_counter() - start)
+
+    requests.Session.send = timed_send
+
+
+def _run_ocr(mode, image_paths):
+    """OCR の方式を実行し、成功した件数を返す"""
+    succeeded = 0
+    if mode == "ocr_batched":
+        for batch in make_batches(image_paths):
+            succeeded += sum(result is not None for result in analyze_receipts_batch(batch))
+    elif mode == "ocr_concurrent":
+        for _, result in analyze_receipts_concurrently(image_paths, CONCURRENCY):
+            succeeded += result is not None
+    else:
+        analyze = analyze_receipt_streaming if mode == "ocr_streaming" else analyze_receipt
+        for image_path in image_paths:
+            try:
+                analyze(str(image_path))
+                succeeded += 1
+            except requests.RequestException as e:
+                print(f"エラー: '{image_path}' の分析に失敗しました: {e}")
+    return succeeded
+
+
+def _run_llm(mode, texts):
+    """Gemini での分析の方式を実行し、成功した件数を返す"""
+    analyzer = ReceiptAnalyzer(structured=True, use_rules=False, base_delay=0.1)
+
+    def analyze(text_content):
+        try:
+            return analyzer.analyze_text(text_content)
+        except Exception as e:
+            print(f"エラー: レシートの分析に失敗しました: {e}")
+            return None
+
+    if mode == "llm_packed":
+        results = analyzer.analyze_many([(str(i), {"full_text": text}) for i, text in enumerate(texts)])
+    elif mode == "llm_concurrent":
+        with ThreadPoolExecutor(max_workers=CONCURRENCY) as executor:
+            results = list(executor.map(analyze, texts))
+    else:
+        results = [analyze(text_content) for text_content in texts]
+    return sum(result is not None for result in results)
+
+
+def run_mode(mode, server_url, image_paths, texts):
+    """1つの方式を実行し、計測結果を返す（別プロセスで実行される）"""
+    genai.configure(api_key="stub", transport="rest", client_options={"api_endpoint": server_url})
+
+    durations = []
+    _install_request_timer(durations)
+
+    start = time.perf_counter()
+    if mode in OCR_MODES:
+        items = len(image_paths)
+        succeeded = _run_ocr(mode, image_paths)
+    else:
+        items = len(texts)
+        succeeded = _run_llm(mode, texts)
+    elapsed = time.perf_counter() - start
+
+    return {
+        "mode": mode,
+        "items": items,
+        "succeeded": succeeded,
+        "elapsed": elapsed,
+        "durations": durations,
+        "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss if resource else None,
+    }
+
+
+def percentile(values, q):
+    """値のリストの q パーセンタイルを返す"""
+    if len(values) < 2:
+        return values[0] if values else 0.0
+    return statistics.quantiles(values, n=100, method="inclusive")[q - 1]
+
+
+def print_report(results):
+    """方式ごとの計測結果を表形式で表示する"""
+    header = f"{'方式':<16}{'件数/秒':>10}{'成功':>8}{'リクエスト':>10}{'p50(ms)':>10}{'p95(ms)':>10}{'最大RSS(MB)':>13}{'送信(KB)':>12}"
+    print("\n" + header)
+    print("-" * len(header))
+    for result in results:
+        durations = result["durations"]
+        rss = f"{result['peak_rss_kb'] / 1024:.1f}" if result["peak_rss_kb"] else "-"
+        print(
+            f"{result['mode']:<16}"
+            f"{result['succeeded'] / result['elapsed']:>10.1f}"
+            f"{result['succeeded']:>5}/{result['items']:<3}"
+            f"{len(durations):>10}"
+            f"{percentile(durations, 50) * 1000:>10.0f}"
+            f"{percentile(durations, 95) * 1000:>10.0f}"
+            f"{rss:>13}"
+            f"{result['bytes_received'] / 1024:>12.0f}"
+        )
+
+
+def main():
+    print("レシート処理ベンチマーク（ローカルのスタブサーバーを使用）")
+
+    server = StubServer(latency=LATENCY, jitter=JITTER, error_rate=ERROR_RATE).start()
+    # 別プロセスで読み込まれる vision_02_read_all が、スタブサーバーに送信するように設定する
+    os.environ["VISION_API_URL"] = f"{server.url}/v1/images:annotate"
+
+    data_dir = Path(__file__).parent / "data"
+    source_images = sorted(f for f in data_dir.iterdir() if f.is_file())
+    image_paths = [source_images[i % len(source_images)] for i in range(IMAGE_COUNT)]
+    texts = [f"レシート {i}\nサンプル商店\n合計 ¥{1000 + i:,}" for i in range(RECEIPT_COUNT)]
+
+    print(f"画像 {IMAGE_COUNT}枚, レシート {RECEIPT_COUNT}件, 同時実行数 {CONCURRENCY}, 待ち時間 {LATENCY}秒, エラー率 {ERROR_RATE:.0%}")
+
+    results = []
+    spawn = multiprocessing.get_context("spawn")
+    for mode in OCR_MODES + LLM_MODES:
+        print(f"'{mode}' を実行中...")
+        server.reset_stats()
+        with ProcessPoolExecutor(max_workers=1, mp_context=spawn) as executor:
+            result = executor.submit(run_mode, mode, server.url, image_paths, texts).result()
+        result["bytes_received"] = server.stats["bytes_received"]
+        results.append(result)
+
+    server.stop()
+    print_report(results)
+
+
+if __name__ == "__main__":
+    main()
@@ -18,11 +18,15 @@ API文書: https://developers.google.com/maps/documentation/routes-preferred/int
 
 import json
 import os
+import sys
 from pathlib import Path
 
-import requests
 from dotenv import load_dotenv
 
+# リポジトリ直下の shared パッケージを読み込めるようにする
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from shared.http_client import default_client
+
 load_dotenv()
 api_key = os.getenv("GOOGLE_CLOUD_PROJECT_API_KEY")
 
@@ -99,7 +103,7 @@ def compute_route_matrix():
         "X-Goog-FieldMask": "originIndex,destinationIndex,duration,distanceMeters,status,condition",
     }
 
-    response = requests.post(url, json=payload, headers=headers)
+    response = default_client().post(url, json=payload, headers=headers, api="routes", operation="computeRouteMatrix")
 
     if response.status_code == 200:
         return response.json()
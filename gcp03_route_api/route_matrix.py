@@ -18,11 +18,15 @@ computeRouteMatrix APIを呼び出してルート情報を取得します。
 
 import json
 import os
+import sys
 from pathlib import Path
 
-import requests
 from dotenv import load_dotenv
 
+# リポジトリ直下の shared パッケージを読み込めるようにする
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from shared.http_client import default_client
+
 load_dotenv()  # Load environment variables from .env file
 
 
@@ -77,7 +81,7 @@ def compute_route_matrix():
         "routingPreference": "TRAFFIC_AWARE",
     }
 
-    response = requests.post(url, json=payload, headers=headers)
+    response = default_client().post(url, json=payload, headers=headers, api="routes", operation="computeRouteMatrix")
 
     if response.status_code == 200:
         return response.json()
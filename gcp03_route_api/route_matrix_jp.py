@@ -1,10 +1,14 @@
 import json
 import os
+import sys
 from pathlib import Path
 
-import requests
 from dotenv import load_dotenv
 
+# リポジトリ直下の shared パッケージを読み込めるようにする
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from shared.http_client import default_client
+
 """
 Google Maps Platformのルートマトリックス計算APIを使用して、
 日本の複数の出発地から単一の目的地へのルート情報を計算し、結果をJSONファイルとして保存するスクリプト。
@@ -62,7 +66,7 @@ def compute_route_matrix():
         "routingPreference": "TRAFFIC_AWARE",
     }
 
-    response = requests.post(url, json=payload, headers=headers)
+    response = default_client().post(url, json=payload, headers=headers, api="routes", operation="computeRouteMatrix")
 
     if response.status_code == 200:
         return response.json()
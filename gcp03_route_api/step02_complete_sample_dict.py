@@ -17,12 +17,16 @@ Directions APIを呼び出して経路情報を取得します。デフォルト
 import datetime
 import json
 import os
+import sys
 import urllib.parse
-import urllib.request
 from pathlib import Path
 
 from dotenv import load_dotenv
 
+# リポジトリ直下の shared パッケージを読み込めるようにする
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from shared.http_client import default_client
+
 load_dotenv()  # Load environment variables from .env file
 
 
@@ -65,10 +69,11 @@ def get_directions(origin, destination, dep_time, mode="walking"):
     print(f"Request URL: {request}")
 
     # Google Maps Platform Directions APIを実行
-    response = urllib.request.urlopen(request).read()
+    response = default_client().get(request, api="directions", operation="directions/json")
+    response.raise_for_status()
 
     # 結果(JSON)を取得
-    return json.loads(response)
+    return response.json()
 
 
 def print_route_info(directions, mode):
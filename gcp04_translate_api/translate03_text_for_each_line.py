@@ -5,11 +5,15 @@
 
 import html
 import os
+import sys
 from pathlib import Path
 
-import requests
 from dotenv import load_dotenv
 
+# リポジトリ直下の shared パッケージを読み込めるようにする
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from shared.http_client import default_client
+
 # Load environment variables
 load_dotenv()
 api_key = os.getenv("GOOGLE_CLOUD_PROJECT_API_KEY")
@@ -31,7 +35,7 @@ def translate_text(text, source_lang="ja", target_lang="en"):
         "format": "html",  # Specify HTML format to preserve tags
     }
 
-    response = requests.post(url, params=params)
+    response = default_client().post(url, params=params, api="translate", operation="translate/v2")
 
     if response.status_code == 200:
         result = response.json()
@@ -1,10 +1,15 @@
 import os
+import sys
 from pathlib import Path
 
 from dotenv import load_dotenv
 from google.api_core.client_options import ClientOptions
 from google.cloud import texttospeech
 
+# リポジトリ直下の shared パッケージを読み込めるようにする
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from shared.instrumentation import instrument
+
 # Load environment variables
 load_dotenv()
 api_key = os.getenv("GOOGLE_CLOUD_PROJECT_API_KEY")
@@ -40,7 +45,10 @@ voice = texttospeech.VoiceSelectionParams(
 audio_config = texttospeech.AudioConfig(audio_encoding=texttospeech.AudioEncoding.MP3)
 
 # Perform the text-to-speech conversion
-response = client.synthesize_speech(input=synthesis_input, voice=voice, audio_config=audio_config)
+with instrument("texttospeech", "synthesizeSpeech") as call:
+    call.bytes_sent = len(text.encode("utf-8"))
+    response = client.synthesize_speech(input=synthesis_input, voice=voice, audio_config=audio_config)
+    call.bytes_received = len(response.audio_content)
 
 # The response's audio_content is binary (the MP3 file)
 with open(output_path, "wb") as out:
@@ -1,11 +1,16 @@
 import json
 import os  # osモジュールをインポート
+import sys
 from pathlib import Path
 
 import gspread
 from dotenv import load_dotenv  # dotenvをインポート
 from google.oauth2.service_account import Credentials
 
+# リポジトリ直下の shared パッケージを読み込めるようにする
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from shared.instrumentation import instrument_gspread
+
 # .env ファイルのパスを明示的に指定
 dotenv_path = Path(__file__).parent / '.env'
 load_dotenv(dotenv_path=dotenv_path)  # .envファイルから環境変数を読み込む
@@ -30,7 +35,7 @@ def check_connection():
         # 明示的にスコープを指定して認証情報をロード
         SCOPES = ['https://www.googleapis.com/auth/spreadsheets.readonly']  # 読み取り専用スコープに変更
         credentials = Credentials.from_service_account_file(CREDENTIALS_FILE, scopes=SCOPES)
-        gc = gspread.authorize(credentials)
+        gc = instrument_gspread(gspread.authorize(credentials))
 
         print("認証成功。スプレッドシートを開こうとしています...")
 
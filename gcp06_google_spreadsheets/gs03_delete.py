@@ -1,10 +1,15 @@
 import os
+import sys
 from pathlib import Path
 
 import gspread
 from dotenv import load_dotenv
 from google.oauth2.service_account import Credentials
 
+# リポジトリ直下の shared パッケージを読み込めるようにする
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from shared.instrumentation import instrument_gspread
+
 # .env ファイルのパスを明示的に指定
 dotenv_path = Path(__file__).parent / '.env'
 load_dotenv(dotenv_path=dotenv_path)
@@ -16,7 +21,7 @@ CREDENTIALS_FILE = Path(__file__).parent / 'credentials.json'
 def delete_target_sheet():
     SCOPES = ['https://www.googleapis.com/auth/spreadsheets']  # スプレッドシートの操作なので drive.readonly は不要
     credentials = Credentials.from_service_account_file(CREDENTIALS_FILE, scopes=SCOPES)
-    gc = gspread.authorize(credentials)
+    gc = instrument_gspread(gspread.authorize(credentials))
 
     print("認証成功。スプレッドシートを開こうとしています...")
 
@@ -0,0 +1,254 @@
+"""多数のカレンダーを asyncio で並行して操作するためのクライアント
+
+GoogleCalendarClient は .env の1つのカレンダーを同期的に操作します。会議室のように数百のカレンダーを扱う場合、
+カレンダーごとに順番に処理すると、待ち時間のほとんどが API の応答待ちになります。
+AsyncCalendarClient は、カレンダーIDを引数に取る非同期のメソッドを提供し、多数のカレンダーへの操作を並行して実行します。
+
+- 全てのカレンダーで同時に実行するリクエスト数の上限（max_concurrency）
+- カレンダーごとに同時に実行するリクエスト数と、1秒あたりのリクエスト数の上限（per_calendar_concurrency, per_calendar_rate）
+
+googleapiclient は同期的なライブラリのため、リクエストはスレッドプールで実行します。
+サービスオブジェクトは calendar_service.get_calendar_service() により、スレッドごとに作成して使い回します。
+
+使い方の例:
+
+>>> import asyncio
+>>> from gcp07_google_calendar.calendar_async import AsyncCalendarClient
+>>>
+>>> async def main(room_ids):
+...     async with AsyncCalendarClient(max_concurrency=20) as client:
+...         return await client.list_events_many(room_ids, time_min=start, time_max=end,
+...                                              fields=['id', 'summary', 'start', 'end'])
+>>>
+>>> results = asyncio.run(main(room_ids))  # {カレンダーID: イベントのリスト または 例外}
+"""
+import asyncio
+import itertools
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from googleapiclient.errors import HttpError
+
+from gcp07_google_calendar.calendar_batch import MAX_RETRIES
+from gcp07_google_calendar.calendar_service import CREDENTIALS_FILE, READONLY_SCOPES, SCOPES, get_calendar_service
+from gcp07_google_calendar.gc05_calendar_class import ALREADY_DELETED_STATUSES, PAGE_SIZE, to_rfc3339
+from shared.instrumentation import execute_request
+
+# 全てのカレンダーで同時に実行するリクエスト数の上限
+MAX_CONCURRENCY = 20
+
+# 1つのカレンダーで同時に実行するリクエスト数の上限
+PER_CALENDAR_CONCURRENCY = 2
+
+# 1つのカレンダーに送信する1秒あたりのリクエスト数の上限（None の場合は制限なし）
+PER_CALENDAR_RATE = 5.0
+
+
+class _CalendarQuota:
+    """1つのカレンダーの同時実行数と、リクエストの間隔を制限する"""
+
+    def __init__(self, concurrency, rate):
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.interval = 1 / rate if rate else 0
+        self._next_time = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait_turn(self):
+        """前回のリクエストから interval 秒が経過するまで待つ"""
+        if not self.interval:
+            return
+        async with self._lock:
+            now = asyncio.get_running_loop().time()
+            delay = self._next_time - now
+            self._next_time = max(now, self._next_time) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class AsyncCalendarClient:
+    """多数のカレンダーを並行して操作するための非同期クライアント
+
+    :param max_concurrency: 全てのカレンダーで同時に実行するリクエスト数の上限
+    :param per_calendar_concurrency: 1つのカレンダーで同時に実行するリクエスト数の上限
+    :param per_calendar_rate: 1つのカレンダーに送信する1秒あたりのリクエスト数の上限（None の場合は制限なし）
+    :param credentials_file: サービスアカウントの認証情報ファイルのパス
+    :param num_retries: レート制限や一時的なエラーの際に、googleapiclient が再送信する回数
+    """
+
+    def __init__(self, max_concurrency=MAX_CONCURRENCY, per_calendar_concurrency=PER_CALENDAR_CONCURRENCY,
+                 per_calendar_rate=PER_CALENDAR_RATE, credentials_file=CREDENTIALS_FILE, num_retries=MAX_RETRIES):
+        self.per_calendar_concurrency = per_calendar_concurrency
+        self.per_calendar_rate = per_calendar_rate
+        self.credentials_file = credentials_file
+        self.num_retries = num_retries
+
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency)
+        self._semaphore = None
+        self._max_concurrency = max_concurrency
+        self._quotas = {}
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        # スレッドの終了を待つ間もイベントループを止めないよう、別のスレッドで待つ
+        await asyncio.get_running_loop().run_in_executor(None, self.close)
+
+    def close(self):
+        """リクエストを実行するスレッドを終了する（実行中のリクエストが完了するまで待つ）
+
+        イベントループの中では、async with を使うか await loop.run_in_executor(None, client.close) で呼び出してください。
+        """
+        self._executor.shutdown(wait=True)
+
+    def _quota(self, calendar_id):
+        if self._semaphore is None:
+            # asyncio のオブジェクトはイベントループの中で作成する
+            self._semaphore = asyncio.Semaphore(self._max_concurrency)
+        if calendar_id not in self._quotas:
+            self._quotas[calendar_id] = _CalendarQuota(self.per_calendar_concurrency, self.per_calendar_rate)
+        return self._quotas[calendar_id]
+
+    def _execute(self, make_request, readonly):
+        """スレッドプールで実行する: このスレッドのサービスオブジェクトでリクエストを実行する"""
+        service = get_calendar_service(READONLY_SCOPES if readonly else SCOPES, self.credentials_file)
+        return execute_request(make_request(service), 'calendar', num_retries=self.num_retries)
+
+    async def _call(self, calendar_id, make_request, readonly=False):
+        """カレンダーごとの制限と全体の同時実行数の制限を守って、リクエストを実行する
+
+        :param calendar_id: カレンダーID
+        :param make_request: サービスオブジェクトを受け取り HttpRequest を返す関数
+        :param readonly: 読み取り専用のスコープを使うかどうか
+        :return: 応答の辞書
+        """
+        quota = self._quota(calendar_id)
+        # カレンダーごとの順番を待ってから全体の枠を確保し、他のカレンダーのリクエストを待たせないようにする
+        async with quota.semaphore:
+            await quota.wait_turn()
+            async with self._semaphore:
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(self._executor, self._execute, make_request, readonly)
+
+    async def iter_events(self, calendar_id, time_min=None, time_max=None, fields=None, page_size=PAGE_SIZE,
+                          **params):
+        """カレンダーのイベントを1ページずつ取得し、1件ずつ返す非同期ジェネレーター
+
+        引数は GoogleCalendarClient.iter_events と同じです。
+
+        :param calendar_id: カレンダーID
+        :raises googleapiclient.errors.HttpError: イベントの取得に失敗した場合
+        """
+        request_params = {
+            'calendarId': calendar_id,
+            'maxResults': page_size,
+            'singleEvents': True,
+            **params,
+        }
+        if time_min is not None:
+            request_params['timeMin'] = to_rfc3339(time_min)
+        if time_max is not None:
+            request_params['timeMax'] = to_rfc3339(time_max)
+        if fields is not None:
+            request_params['fields'] = f"nextPageToken,items({','.join(fields)})"
+
+        page_token = None
+        while True:
+            response = await self._call(
+                calendar_id,
+                lambda service: service.events().list(pageToken=page_token, **request_params),
+                readonly=True,
+            )
+            for event in response.get('items', []):
+                yield event
+            page_token = response.get('nextPageToken')
+            if not page_token:
+                break
+
+    async def list_events(self, calendar_id, **kwargs):
+        """カレンダーのイベントをリストで返す（引数は iter_events と同じ）
+
+        :raises googleapiclient.errors.HttpError: イベントの取得に失敗した場合
+        """
+        return [event async for event in self.iter_events(calendar_id, **kwargs)]
+
+    async def insert_event(self, calendar_id, body):
+        """イベントを追加する
+
+        再送信で同じイベントが重複して作成されないよう、body に id がない場合はクライアント側で割り当てます。
+
+        :param calendar_id: カレンダーID
+        :param body: イベントの本文（summary, start, end などを含む API のイベントの形式の辞書）
+        :return: 作成されたイベント
+        :raises googleapiclient.errors.HttpError: イベントの追加に失敗した場合
+        """
+        assign_id = 'id' not in body
+        if assign_id:
+            # base32hex（0-9, a-v）の範囲の文字で、重複しないIDを割り当てる
+            body = {**body, 'id': uuid.uuid4().hex}
+        try:
+            return await self._call(
+                calendar_id, lambda service: service.events().insert(calendarId=calendar_id, body=body)
+            )
+        except HttpError as e:
+            if not assign_id or e.resp.status != 409:
+                raise
+        # 再送信前のリクエストで作成済みだった場合（同じIDのイベントが既に存在する）は、保存されたイベントを返す
+        return await self._call(
+            calendar_id, lambda service: service.events().get(calendarId=calendar_id, eventId=body['id'])
+        )
+
+    async def delete_event(self, calendar_id, event_id):
+        """イベントを削除する（既に削除されている場合も成功として扱う）
+
+        :param calendar_id: カレンダーID
+        :param event_id: 削除するイベントのID
+        :raises googleapiclient.errors.HttpError: イベントの削除に失敗した場合
+        """
+        try:
+            await self._call(
+                calendar_id, lambda service: service.events().delete(calendarId=calendar_id, eventId=event_id)
+            )
+        except HttpError as e:
+            if e.resp.status not in ALREADY_DELETED_STATUSES:
+                raise
+
+    async def list_events_many(self, calendar_ids, **kwargs):
+        """複数のカレンダーのイベントを並行して取得する
+
+        :param calendar_ids: カレンダーIDのリスト
+        :param kwargs: iter_events に渡す引数（time_min, time_max, fields など）
+        :return: {カレンダーID: イベントのリスト}。取得に失敗したカレンダーの値はその例外
+        """
+        calendar_ids = list(dict.fromkeys(calendar_ids))
+        results = await asyncio.gather(
+            *(self.list_events(calendar_id, **kwargs) for calendar_id in calendar_ids), return_exceptions=True
+        )
+        return dict(zip(calendar_ids, results))
+
+    async def insert_events_many(self, events_by_calendar):
+        """複数のカレンダーにイベントを並行して追加する
+
+        :param events_by_calendar: {カレンダーID: イベントの本文のリスト}
+        :return: {カレンダーID: 入力と同じ順序の結果のリスト}。各要素は作成されたイベント、失敗した場合はその例外
+        """
+        return await self._gather_by_calendar(events_by_calendar, self.insert_event)
+
+    async def delete_events_many(self, event_ids_by_calendar):
+        """複数のカレンダーのイベントを並行して削除する
+
+        :param event_ids_by_calendar: {カレンダーID: 削除するイベントのIDのリスト}
+        :return: {カレンダーID: 入力と同じ順序の結果のリスト}。各要素は成功した場合は None、失敗した場合はその例外
+        """
+        return await self._gather_by_calendar(event_ids_by_calendar, self.delete_event)
+
+    async def _gather_by_calendar(self, items_by_calendar, operation):
+        """operation(カレンダーID, 要素) を全ての要素について並行して実行し、カレンダーごとの結果にまとめる"""
+        results = iter(await asyncio.gather(
+            *(operation(calendar_id, item) for calendar_id, items in items_by_calendar.items() for item in items),
+            return_exceptions=True,
+        ))
+        return {
+            calendar_id: list(itertools.islice(results, len(items)))
+            for calendar_id, items in items_by_calendar.items()
+        }
@@ -0,0 +1,162 @@
+"""Google Calendar API のリクエストをまとめて送信するためのモジュール
+
+googleapiclient の BatchHttpRequest を使い、最大50件のリクエストを1回の HTTP 通信で送信します。
+リクエストごとに成功・失敗を判定し、レート制限（403 rateLimitExceeded / 429）や
+一時的なサーバーエラー（5xx）で失敗したリクエストだけを、待ち時間を延ばしながら再送信します。
+
+使い方の例:
+
+>>> from gcp07_google_calendar.calendar_batch import execute_batched
+>>> requests = {
+...     str(i): (lambda service, body=body: service.events().insert(calendarId=calendar_id, body=body))
+...     for i, body in enumerate(bodies)
+... }
+>>> results = execute_batched(service, requests)
+>>> response, error = results['0']
+"""
+import random
+import socket
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import httplib2
+from googleapiclient.errors import HttpError
+
+from shared.instrumentation import instrument
+
+# 1回のバッチリクエストにまとめるリクエスト数（Calendar API の推奨上限は50件）
+BATCH_SIZE = 50
+
+# 失敗したリクエストを再送信する回数と、最初の再送信までの待ち時間の基準（秒）
+MAX_RETRIES = 5
+BASE_DELAY = 1.0
+
+# 再送信の待ち時間の上限（秒）
+MAX_DELAY = 60.0
+
+# 再送信するHTTPステータスと、403 の場合に再送信するエラーの理由
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+RETRY_REASONS = {'rateLimitExceeded', 'userRateLimitExceeded'}
+
+# 再送信する通信エラーとタイムアウトの例外
+TRANSPORT_ERRORS = (ConnectionError, TimeoutError, socket.timeout, httplib2.HttpLib2Error)
+
+
+def is_retryable(error):
+    """エラーが、時間をおいて再送信すれば成功する可能性のあるものかどうかを返す
+
+    :param error: リクエストで発生した例外
+    :return: 再送信の対象であれば True
+    """
+    if not isinstance(error, HttpError):
+        # 通信エラーやタイムアウト（認証情報ファイルがない場合などの OSError は再送信しない）
+        return isinstance(error, TRANSPORT_ERRORS)
+    status = error.resp.status
+    if status in RETRY_STATUSES:
+        return True
+    if status == 403:
+        reasons = {detail.get('reason') for detail in (error.error_details or []) if isinstance(detail, dict)}
+        return bool(reasons & RETRY_REASONS)
+    return False
+
+
+def _chunks(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def _execute_chunk(get_service, request_ids, requests):
+    """1回のバッチリクエストを送信し、{リクエストID: (応答, 例外)} を返す
+
+    サービスオブジェクトやリクエストの作成で発生した例外も、例外を送出せずに該当するリクエストの失敗として返します。
+    """
+    outcome = {}
+
+    def callback(request_id, response, exception):
+        outcome[request_id] = (response, exception)
+
+    try:
+        service = get_service()
+        batch = service.new_batch_http_request(callback=callback)
+    except Exception as e:
+        # 認証情報の読み込みなどに失敗した場合は、全てのリクエストを同じ例外で失敗とする
+        return {request_id: (None, e) for request_id in request_ids}
+
+    for request_id in request_ids:
+        try:
+            batch.add(requests[request_id](service), request_id=request_id)
+        except Exception as e:
+            # リクエストを作成できなかった場合は、そのリクエストだけを失敗とする
+            outcome[request_id] = (None, e)
+
+    try:
+        with instrument('calendar', 'batch'):
+            batch.execute()
+    except Exception as e:
+        # バッチ全体が失敗した場合は、応答のなかったリクエストを同じ例外で失敗とする
+        for request_id in request_ids:
+            outcome.setdefault(request_id, (None, e))
+    return outcome
+
+
+def _iter_chunk_outcomes(service, chunks, requests, max_workers, service_factory):
+    """バッチリクエストを送信し、完了したものから結果を返すジェネレーター"""
+    if max_workers <= 1:
+        for chunk in chunks:
+            yield _execute_chunk(lambda: service, chunk, requests)
+        return
+
+    # サービスオブジェクトはスレッドセーフではないため、各スレッドで service_factory から取得する
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(_execute_chunk, service_factory, chunk, requests) for chunk in chunks]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def execute_batched(service, requests, batch_size=BATCH_SIZE, max_retries=MAX_RETRIES, base_delay=BASE_DELAY,
+                    on_progress=None, max_workers=1, service_factory=None):
+    """リクエストを batch_size 件ずつまとめて送信し、リクエストごとの結果を返す
+
+    再送信の対象となるエラーで失敗したリクエストだけを集め、待ち時間をおいてまとめて再送信します。
+    max_workers を2以上にすると、複数のバッチリクエストを並行して送信します。
+
+    :param service: Calendar API のサービスオブジェクト
+    :param requests: {リクエストID (str): サービスを受け取り HttpRequest を返す関数} の辞書
+    :param batch_size: 1回のバッチリクエストにまとめるリクエスト数（最大50）
+    :param max_retries: 失敗したリクエストを再送信する回数
+    :param base_delay: 最初の再送信までの待ち時間の基準（秒）。再送信のたびに2倍になります
+    :param on_progress: バッチリクエストごとに (完了した件数, 全体の件数) を受け取る関数
+    :param max_workers: 並行して送信するバッチリクエストの数
+    :param service_factory: 呼び出したスレッド用のサービスオブジェクトを返す関数（max_workers が2以上の場合に必須）
+    :return: {リクエストID: (応答, 例外)}。成功したリクエストの例外は None
+    :raises ValueError: max_workers が2以上で service_factory が指定されていない場合
+    """
+    if max_workers > 1 and service_factory is None:
+        raise ValueError('max_workers を2以上にする場合は service_factory を指定してください')
+
+    results = {}
+    pending = list(requests)
+    total = len(pending)
+
+    for attempt in range(max_retries + 1):
+        retry_ids = []
+        chunks = list(_chunks(pending, batch_size))
+        for outcome in _iter_chunk_outcomes(service, chunks, requests, max_workers, service_factory):
+            for request_id, (response, error) in outcome.items():
+                if error is not None and attempt < max_retries and is_retryable(error):
+                    retry_ids.append(request_id)
+                else:
+                    results[request_id] = (response, error)
+            if on_progress is not None:
+                on_progress(len(results), total)
+
+        if not retry_ids:
+            break
+
+        # 同時に失敗したリクエストが一斉に再送信しないよう、待ち時間をばらつかせる
+        delay = random.uniform(0, min(base_delay * 2**attempt, MAX_DELAY))
+        print(f"警告: {len(retry_ids)}件のリクエストが一時的なエラーで失敗したため、{delay:.1f}秒後に再送信します。")
+        time.sleep(delay)
+        pending = retry_ids
+
+    return results
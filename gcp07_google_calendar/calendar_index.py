@@ -0,0 +1,148 @@
+"""取得済みのイベントから、空き時間と重なるイベントを高速に検索するためのモジュール
+
+イベントを開始日時の順に並べた配列と、その配列を二分木とみなした各部分木の「終了日時の最大値」を作成します。
+終了日時の最大値が検索の開始日時より前の部分木と、開始日時が検索の終了日時より後の部分木は調べずに済むため、
+指定した時間帯と重なるイベントを O(log n + 該当件数) で検索できます。
+
+同じイベント一覧に対して「この時間帯は空いているか」「どのイベントと重なるか」を何度も問い合わせる場合は、
+イベント一覧を毎回先頭から調べる代わりに、EventIndex を1度作成して使い回してください。
+
+使い方の例:
+
+>>> from datetime import datetime, timedelta
+>>> from gcp07_google_calendar.calendar_index import EventIndex, find_free_slots
+>>> index = EventIndex(client.iter_events(datetime(2025, 5, 1), datetime(2025, 6, 1)))
+>>> index.is_free(datetime(2025, 5, 10, 10, 0), datetime(2025, 5, 10, 11, 0))
+False
+>>> [event['summary'] for event in index.overlapping(datetime(2025, 5, 10, 10, 0), datetime(2025, 5, 10, 11, 0))]
+['新しい予定']
+>>> # 複数のカレンダーで共通の空き時間（30分以上）を検索
+>>> slots = find_free_slots([index, other_index], datetime(2025, 5, 12, 9, 0), datetime(2025, 5, 12, 18, 0),
+...                         timedelta(minutes=30))
+"""
+import datetime
+
+from gcp07_google_calendar.gc05_calendar_class import parse_event_time
+
+
+def _timestamp(value):
+    """datetime を UNIX 時刻に変換（タイムゾーンのない datetime はローカル時刻とみなす）"""
+    return value.astimezone().timestamp()
+
+
+class EventIndex:
+    """イベントの開始・終了日時による検索用のインデックス
+
+    作成後にイベントを追加・削除することはできません。イベントが変わった場合は作り直してください。
+
+    :param events: イベントの辞書のイテラブル（events().list の items や EventStore.list_events() の結果）。
+                   開始・終了日時のないイベントと、削除済み (status が 'cancelled') のイベントは無視します
+    """
+
+    def __init__(self, events):
+        entries = []
+        for event in events:
+            if event.get('status') == 'cancelled' or 'start' not in event or 'end' not in event:
+                continue
+            entries.append((
+                parse_event_time(event['start']).timestamp(),
+                parse_event_time(event['end']).timestamp(),
+                event,
+            ))
+        entries.sort(key=lambda entry: entry[0])
+
+        self._starts = [entry[0] for entry in entries]
+        self._ends = [entry[1] for entry in entries]
+        self._events = [entry[2] for entry in entries]
+        # _max_ends[mid] は、mid を根とする部分木（配列の範囲 [lo, hi)）に含まれるイベントの終了日時の最大値
+        self._max_ends = [0.0] * len(entries)
+        self._build(0, len(entries))
+
+    def __len__(self):
+        return len(self._events)
+
+    def _build(self, lo, hi):
+        """配列の範囲 [lo, hi) を部分木として、終了日時の最大値を計算する"""
+        if lo >= hi:
+            return float('-inf')
+        mid = (lo + hi) // 2
+        self._max_ends[mid] = max(self._ends[mid], self._build(lo, mid), self._build(mid + 1, hi))
+        return self._max_ends[mid]
+
+    def _iter_overlapping(self, start, end):
+        """時間帯 [start, end)（UNIX 時刻）と重なるイベントの位置を開始日時の順に返すジェネレーター"""
+        # 再帰の代わりにスタックで部分木をたどる。(lo, hi, 左の部分木を調べたかどうか)
+        stack = [(0, len(self._events), False)]
+        while stack:
+            lo, hi, left_done = stack.pop()
+            if lo >= hi:
+                continue
+            mid = (lo + hi) // 2
+            if not left_done:
+                # 部分木の全てのイベントが start までに終了している
+                if self._max_ends[mid] <= start:
+                    continue
+                stack.append((lo, hi, True))
+                stack.append((lo, mid, False))
+                continue
+            # mid 以降のイベントは全て end 以降に開始する
+            if self._starts[mid] >= end:
+                continue
+            if self._ends[mid] > start:
+                yield mid
+            stack.append((mid + 1, hi, False))
+
+    def overlapping(self, start, end):
+        """指定した時間帯と重なるイベントを開始日時の順に返す
+
+        :param start: 時間帯の開始日時 (datetime.datetime)
+        :param end: 時間帯の終了日時 (datetime.datetime)
+        :return: イベントの辞書のリスト。終了日時がちょうど start のイベントと、開始日時がちょうど end のイベントは含みません
+        """
+        return [self._events[i] for i in self._iter_overlapping(_timestamp(start), _timestamp(end))]
+
+    def is_free(self, start, end):
+        """指定した時間帯に重なるイベントがないかどうかを返す
+
+        重なるイベントが1件見つかった時点で検索を終了します。
+
+        :param start: 時間帯の開始日時 (datetime.datetime)
+        :param end: 時間帯の終了日時 (datetime.datetime)
+        :return: 重なるイベントがなければ True
+        """
+        return next(self._iter_overlapping(_timestamp(start), _timestamp(end)), None) is None
+
+    def busy_periods(self, start, end):
+        """指定した時間帯と重なるイベントの (開始, 終了) の UNIX 時刻のリストを開始日時の順に返す"""
+        return [(self._starts[i], self._ends[i]) for i in self._iter_overlapping(_timestamp(start), _timestamp(end))]
+
+
+def find_free_slots(indexes, start, end, min_duration=datetime.timedelta(0)):
+    """全てのカレンダーでイベントのない時間帯を返す
+
+    各カレンダーの、期間と重なるイベントだけをインデックスから取り出し、開始日時の順に並べて隙間を探します。
+
+    :param indexes: カレンダーごとの EventIndex のリスト
+    :param start: 検索する期間の開始日時 (datetime.datetime)
+    :param end: 検索する期間の終了日時 (datetime.datetime)
+    :param min_duration: 空き時間として返す最短の長さ (datetime.timedelta)
+    :return: (開始, 終了) の datetime.datetime のタプルのリスト（start のタイムゾーン。start にタイムゾーンがない場合はローカル時刻）
+    """
+    tz = start.tzinfo or start.astimezone().tzinfo
+    range_start, range_end = _timestamp(start), _timestamp(end)
+    min_seconds = min_duration.total_seconds()
+
+    busy = sorted(period for index in indexes for period in index.busy_periods(start, end))
+
+    slots = []
+    cursor = range_start
+    for busy_start, busy_end in busy + [(range_end, range_end)]:
+        if busy_start > cursor and busy_start - cursor >= min_seconds:
+            slots.append((
+                datetime.datetime.fromtimestamp(cursor, tz),
+                datetime.datetime.fromtimestamp(min(busy_start, range_end), tz),
+            ))
+        cursor = max(cursor, busy_end)
+        if cursor >= range_end:
+            break
+    return slots
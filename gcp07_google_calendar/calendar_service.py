@@ -0,0 +1,82 @@
+"""Google Calendar API のサービスオブジェクトを使い回すためのモジュール
+
+認証情報ファイルの読み込みと build('calendar', 'v3', ...) によるサービスオブジェクトの作成は、
+1回あたり数百ミリ秒かかります。操作のたびに作成する代わりに、このモジュールの
+get_calendar_service() を使うと、同じスコープの認証情報（取得済みのアクセストークンを含む）と
+サービスオブジェクトを使い回します。
+
+- 認証情報は、認証情報ファイルとスコープの組み合わせごとにプロセス内で共有します
+- サービスオブジェクトはスレッドセーフではないため、スレッドごとに作成して使い回します
+
+使い方の例:
+
+>>> from gcp07_google_calendar.calendar_service import get_calendar_service, READONLY_SCOPES
+>>> service = get_calendar_service(READONLY_SCOPES)
+>>> service is get_calendar_service(READONLY_SCOPES)
+True
+"""
+import threading
+from pathlib import Path
+
+from google.oauth2.service_account import Credentials
+from googleapiclient.discovery import build
+
+CREDENTIALS_FILE = Path(__file__).parent / 'credentials.json'
+
+# Google Calendar API のスコープ ref: https://developers.google.com/calendar/api/guides/auth
+SCOPES = ['https://www.googleapis.com/auth/calendar']
+READONLY_SCOPES = ['https://www.googleapis.com/auth/calendar.readonly']
+
+_credentials_cache = {}
+_credentials_lock = threading.Lock()
+_thread_local = threading.local()
+
+
+def _cache_key(scopes, credentials_file):
+    return str(Path(credentials_file).resolve()), frozenset(scopes)
+
+
+def get_credentials(scopes=SCOPES, credentials_file=CREDENTIALS_FILE):
+    """スコープに対応する認証情報を返す（2回目以降はファイルを読み込まずに使い回す）
+
+    :param scopes: 認証情報のスコープのリスト
+    :param credentials_file: サービスアカウントの認証情報ファイルのパス
+    :return: google.oauth2.service_account.Credentials
+    :raises FileNotFoundError: 認証情報ファイルが見つからない場合
+    """
+    key = _cache_key(scopes, credentials_file)
+    with _credentials_lock:
+        if key not in _credentials_cache:
+            _credentials_cache[key] = Credentials.from_service_account_file(credentials_file, scopes=list(scopes))
+        return _credentials_cache[key]
+
+
+def get_calendar_service(scopes=SCOPES, credentials_file=CREDENTIALS_FILE):
+    """スコープに対応する Calendar API のサービスオブジェクトを返す
+
+    同じスレッドから同じスコープで呼び出した場合は、作成済みのサービスオブジェクトを返します。
+
+    :param scopes: 認証情報のスコープのリスト
+    :param credentials_file: サービスアカウントの認証情報ファイルのパス
+    :return: Calendar API のサービスオブジェクト (googleapiclient.discovery.Resource)
+    :raises FileNotFoundError: 認証情報ファイルが見つからない場合
+    """
+    key = _cache_key(scopes, credentials_file)
+    services = getattr(_thread_local, 'services', None)
+    if services is None:
+        services = _thread_local.services = {}
+
+    if key not in services:
+        creds = get_credentials(scopes, credentials_file)
+        services[key] = build('calendar', 'v3', credentials=creds, cache_discovery=False)
+    return services[key]
+
+
+def clear_service_cache():
+    """キャッシュした認証情報と、このスレッドのサービスオブジェクトを破棄する
+
+    認証情報ファイルを差し替えた場合などに呼び出します。
+    """
+    with _credentials_lock:
+        _credentials_cache.clear()
+    _thread_local.services = {}
@@ -0,0 +1,231 @@
+"""Google Calendar のイベントを SQLite に保存し、差分だけを同期するためのモジュール
+
+最初の同期ではカレンダーの全てのイベントを取得して保存し、API が返す nextSyncToken を一緒に保存します。
+2回目以降は保存した同期トークンを syncToken に指定して、前回の同期以降に追加・変更・削除された
+イベントだけを取得します。同期トークンの有効期限が切れた場合（410 Gone）は、全てのイベントを取得し直します。
+
+1回の同期で取得した変更は、同期トークンと一緒に1つのトランザクションで保存するため、
+途中でエラーが発生した場合も、保存済みのイベントと同期トークンが食い違うことはありません。
+
+使い方の例:
+
+>>> from gcp07_google_calendar.calendar_sync import CalendarSync, EventStore
+>>> from gcp07_google_calendar.gc05_calendar_class import GoogleCalendarClient
+>>> with EventStore() as store:
+...     sync = CalendarSync(GoogleCalendarClient(), store)
+...     sync.sync()
+...     events = store.list_events(sync.calendar_id)
+カレンダーの全てのイベントを取得しています...
+同期しました: 更新 120件 / 削除 0件 (保存件数: 120件)
+"""
+import json
+import sqlite3
+import threading
+from pathlib import Path
+
+from googleapiclient.errors import HttpError
+
+from gcp07_google_calendar.gc05_calendar_class import PAGE_SIZE, parse_event_time
+
+DB_PATH = Path(__file__).parent / 'calendar_sync.sqlite3'
+
+
+class EventStore:
+    """同期したイベントと同期トークンを保存する SQLite のストア
+
+    イベントは API の応答の JSON をそのまま保存し、期間での検索のために開始・終了日時（UNIX 時刻）を別の列に保存します。
+    save_events / clear / save_sync_token による変更は、commit() を呼び出すまで確定しません。
+
+    :param db_path: SQLite データベースファイルのパス
+    """
+
+    def __init__(self, db_path=DB_PATH):
+        self.db_path = Path(db_path)
+
+        # 並行処理のスクリプトからも使えるように、接続はロックで保護する
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS events (
+                calendar_id TEXT NOT NULL,
+                event_id TEXT NOT NULL,
+                start_time REAL,
+                end_time REAL,
+                data TEXT NOT NULL,
+                PRIMARY KEY (calendar_id, event_id)
+            );
+            CREATE INDEX IF NOT EXISTS events_start_time ON events (calendar_id, start_time);
+            CREATE TABLE IF NOT EXISTS sync_state (
+                calendar_id TEXT PRIMARY KEY,
+                sync_token TEXT NOT NULL
+            );
+            """
+        )
+
+    def get_sync_token(self, calendar_id):
+        """保存した同期トークンを返す（まだ同期していない場合は None）"""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT sync_token FROM sync_state WHERE calendar_id = ?', (calendar_id,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def save_events(self, calendar_id, events):
+        """API から取得したイベントを保存する
+
+        status が 'cancelled' のイベント（差分の同期で返される削除済みのイベント）は、保存済みのイベントから削除します。
+
+        :param calendar_id: カレンダーID
+        :param events: events().list の応答の items
+        :return: (保存したイベント数, 削除したイベント数)
+        """
+        upserts = []
+        deleted_ids = []
+        for event in events:
+            if event.get('status') == 'cancelled':
+                deleted_ids.append((calendar_id, event['id']))
+                continue
+            start = parse_event_time(event['start']).timestamp() if 'start' in event else None
+            end = parse_event_time(event['end']).timestamp() if 'end' in event else None
+            upserts.append((calendar_id, event['id'], start, end, json.dumps(event, ensure_ascii=False)))
+
+        with self._lock:
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO events (calendar_id, event_id, start_time, end_time, data) VALUES (?, ?, ?, ?, ?)',
+                upserts,
+            )
+            self._conn.executemany('DELETE FROM events WHERE calendar_id = ? AND event_id = ?', deleted_ids)
+        return len(upserts), len(deleted_ids)
+
+    def save_sync_token(self, calendar_id, sync_token):
+        """同期トークンを保存する"""
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO sync_state (calendar_id, sync_token) VALUES (?, ?)', (calendar_id, sync_token)
+            )
+
+    def clear(self, calendar_id):
+        """カレンダーの保存済みのイベントと同期トークンを削除する"""
+        with self._lock:
+            self._conn.execute('DELETE FROM events WHERE calendar_id = ?', (calendar_id,))
+            self._conn.execute('DELETE FROM sync_state WHERE calendar_id = ?', (calendar_id,))
+
+    def commit(self):
+        """変更を確定する"""
+        with self._lock:
+            self._conn.commit()
+
+    def rollback(self):
+        """確定していない変更を取り消す"""
+        with self._lock:
+            self._conn.rollback()
+
+    def list_events(self, calendar_id, time_min=None, time_max=None):
+        """保存済みのイベントを開始日時の順に返す
+
+        :param calendar_id: カレンダーID
+        :param time_min: この日時より後に終了するイベントだけを返す (datetime.datetime)。省略時は制限なし
+        :param time_max: この日時より前に開始するイベントだけを返す (datetime.datetime)。省略時は制限なし
+        :return: イベントの辞書のリスト
+        """
+        query = 'SELECT data FROM events WHERE calendar_id = ?'
+        params = [calendar_id]
+        if time_min is not None:
+            query += ' AND end_time > ?'
+            params.append(time_min.astimezone().timestamp())
+        if time_max is not None:
+            query += ' AND start_time < ?'
+            params.append(time_max.astimezone().timestamp())
+        query += ' ORDER BY start_time'
+
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def count(self, calendar_id):
+        """保存済みのイベント数を返す"""
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM events WHERE calendar_id = ?', (calendar_id,)).fetchone()[0]
+
+    def close(self):
+        """データベースへの接続を閉じる"""
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class CalendarSync:
+    """GoogleCalendarClient のカレンダーを EventStore に同期するクラス
+
+    :param client: GoogleCalendarClient
+    :param store: EventStore
+    :param page_size: 1回のリクエストで取得するイベント数（最大2500）
+    """
+
+    def __init__(self, client, store, page_size=PAGE_SIZE):
+        self.client = client
+        self.store = store
+        self.page_size = page_size
+
+    @property
+    def calendar_id(self):
+        return self.client.calendar_id
+
+    def sync(self):
+        """前回の同期以降の変更を取得して保存する（初回と同期トークンの期限切れの場合は全件を取得）
+
+        :return: {'full': 全件を取得したかどうか, 'updated': 保存したイベント数, 'deleted': 削除したイベント数}。
+                 イベントを取得できなかった場合は None
+        :raises googleapiclient.errors.HttpError: イベントの取得に失敗した場合
+        """
+        sync_token = self.store.get_sync_token(self.calendar_id)
+        if sync_token is not None:
+            try:
+                return self._sync(sync_token)
+            except HttpError as e:
+                if e.resp.status != 410:
+                    raise
+                print("警告: 同期トークンの有効期限が切れたため、全てのイベントを取得し直します。")
+        return self._sync(None)
+
+    def _sync(self, sync_token):
+        """同期トークン（None の場合は全件）で変更を取得し、1つのトランザクションで保存する"""
+        # 差分の同期では、初回と同じ条件（singleEvents）を指定する必要がある
+        params = {'maxResults': self.page_size, 'singleEvents': True}
+        if sync_token is None:
+            print("カレンダーの全てのイベントを取得しています...")
+            self.store.clear(self.calendar_id)
+        else:
+            params['syncToken'] = sync_token
+
+        result = {'full': sync_token is None, 'updated': 0, 'deleted': 0}
+        next_sync_token = None
+        try:
+            for page in self.client.iter_pages(**params):
+                updated, deleted = self.store.save_events(self.calendar_id, page.get('items', []))
+                result['updated'] += updated
+                result['deleted'] += deleted
+                # nextSyncToken は最後のページにだけ含まれる
+                next_sync_token = page.get('nextSyncToken', next_sync_token)
+        except Exception:
+            self.store.rollback()
+            raise
+
+        if next_sync_token is None:
+            self.store.rollback()
+            print("エラー: イベントを取得できなかったため、同期を中止しました。")
+            return None
+
+        self.store.save_sync_token(self.calendar_id, next_sync_token)
+        self.store.commit()
+        print(
+            f"同期しました: 更新 {result['updated']}件 / 削除 {result['deleted']}件 "
+            f"(保存件数: {self.store.count(self.calendar_id)}件)"
+        )
+        return result
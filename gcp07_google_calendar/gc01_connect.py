@@ -1,9 +1,12 @@
 import os
+import sys
 from pathlib import Path
 
 from dotenv import load_dotenv
-from google.oauth2.service_account import Credentials
-from googleapiclient.discovery import build
+
+# リポジトリ直下のパッケージを読み込めるようにする
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from gcp07_google_calendar.calendar_service import get_calendar_service
 
 CREDENTIALS_FILE = Path(__file__).parent / 'credentials.json'
 
@@ -21,6 +24,7 @@ def connect_to_calendar():
 
     サービスアカウントの認証情報を使用し、指定されたスコープで
     Google Calendar APIサービスクライアントを構築して返します。
+    2回目以降の呼び出しでは、構築済みのサービスクライアントを返します。
 
     :returns: 認証済みのCalendar APIサービスオブジェクト。
               認証に失敗した場合は None。
@@ -29,8 +33,7 @@ def connect_to_calendar():
     :raises Exception: その他のAPIクライアント構築時のエラー。
     '''
     try:
-        creds = Credentials.from_service_account_file(CREDENTIALS_FILE, scopes=SCOPES)
-        service = build('calendar', 'v3', credentials=creds, cache_discovery=False)
+        service = get_calendar_service(SCOPES, CREDENTIALS_FILE)
         print("Google Calendar APIへの接続に成功しました。")
         return service
     except FileNotFoundError:
@@ -1,10 +1,14 @@
 import datetime
 import os
+import sys
 from pathlib import Path
 
 from dotenv import load_dotenv
-from google.oauth2.service_account import Credentials
-from googleapiclient.discovery import build
+
+# リポジトリ直下のパッケージを読み込めるようにする
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from gcp07_google_calendar.calendar_service import get_calendar_service
+from shared.instrumentation import execute_request
 
 
 def add_event_to_calendar(calendar_id, summary, description, start_time, end_time, timezone='Asia/Tokyo'):
@@ -12,12 +16,11 @@ def add_event_to_calendar(calendar_id, summary, description, start_time, end_tim
 
     接続処理を内部で行い、カレンダーIDや概要などの必要情報のみを引数として受け取ります。
     """
-    # 接続処理を内部で行う
+    # 接続処理を内部で行う（2回目以降は作成済みのサービスを使い回す）
     CREDENTIALS_FILE = Path(__file__).parent / 'credentials.json'
     SCOPES = ['https://www.googleapis.com/auth/calendar']
     try:
-        creds = Credentials.from_service_account_file(CREDENTIALS_FILE, scopes=SCOPES)
-        service = build('calendar', 'v3', credentials=creds, cache_discovery=False)
+        service = get_calendar_service(SCOPES, CREDENTIALS_FILE)
     except Exception as e:
         print(f"Google Calendar APIへの接続中にエラーが発生しました: {e}")
         return None
@@ -35,7 +38,7 @@ def add_event_to_calendar(calendar_id, summary, description, start_time, end_tim
         },
     }
 
-    created_event = service.events().insert(calendarId=calendar_id, body=event).execute()
+    created_event = execute_request(service.events().insert(calendarId=calendar_id, body=event), 'calendar')
     print(f"イベントを作成しました: {created_event.get('htmlLink')}")
     return created_event
 
@@ -1,10 +1,14 @@
 import datetime
 import os
+import sys
 from pathlib import Path
 
 from dotenv import load_dotenv
-from google.oauth2.service_account import Credentials
-from googleapiclient.discovery import build
+
+# リポジトリ直下のパッケージを読み込めるようにする
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from gcp07_google_calendar.calendar_service import get_calendar_service
+from shared.instrumentation import execute_request
 
 
 def list_events(calendar_id, max_results=10):
@@ -14,13 +18,12 @@ def list_events(calendar_id, max_results=10):
     :param max_results: 取得するイベントの最大数（デフォルト: 10）
     :return: 取得したイベントのリスト。失敗した場合はNone
     """
-    # 接続処理を内部で行う
+    # 接続処理を内部で行う（2回目以降は作成済みのサービスを使い回す）
     CREDENTIALS_FILE = Path(__file__).parent / 'credentials.json'
     SCOPES = ['https://www.googleapis.com/auth/calendar.readonly']  # 読み取り専用スコープ
 
     try:
-        creds = Credentials.from_service_account_file(CREDENTIALS_FILE, scopes=SCOPES)
-        service = build('calendar', 'v3', credentials=creds, cache_discovery=False)
+        service = get_calendar_service(SCOPES, CREDENTIALS_FILE)
         print("Google Calendar APIへの接続に成功しました。")
     except Exception as e:
         print(f"エラーが発生しました: {e}")
@@ -30,13 +33,13 @@ def list_events(calendar_id, max_results=10):
     now = datetime.datetime.now(datetime.timezone.utc).isoformat()
 
     print(f'直近{max_results}件のイベントを取得します...')
-    events_result = service.events().list(
+    events_result = execute_request(service.events().list(
         calendarId=calendar_id,
         timeMin=now,
         maxResults=max_results,
         singleEvents=True,
         orderBy='startTime'
-    ).execute()
+    ), 'calendar')
 
     events = events_result.get('items', [])
 
@@ -58,20 +61,19 @@ def delete_event(calendar_id, event_id):
     :param event_id: 削除するイベントのID
     :return: 削除成功時はTrue、失敗時はFalse
     """
-    # 接続処理を内部で行う
+    # 接続処理を内部で行う（2回目以降は作成済みのサービスを使い回す）
     CREDENTIALS_FILE = Path(__file__).parent / 'credentials.json'
     SCOPES = ['https://www.googleapis.com/auth/calendar']  # 削除には書き込み権限が必要
 
     try:
-        creds = Credentials.from_service_account_file(CREDENTIALS_FILE, scopes=SCOPES)
-        service = build('calendar', 'v3', credentials=creds, cache_discovery=False)
+        service = get_calendar_service(SCOPES, CREDENTIALS_FILE)
         print("Google Calendar APIへの接続に成功しました。")
     except Exception as e:
         print(f"エラーが発生しました: {e}")
         return False
 
     print(f"イベント (ID: {event_id}) を削除しています...")
-    service.events().delete(calendarId=calendar_id, eventId=event_id).execute()
+    execute_request(service.events().delete(calendarId=calendar_id, eventId=event_id), 'calendar')
     print(f"イベントを削除しました。")
     return True
 
@@ -17,28 +17,89 @@ Google Calendar APIを使ってイベントの閲覧、作成、削除などの
 >>> event = client.add_event("新しい予定", "詳細文章です", start_time, end_time)
 イベントを作成しました: https://www.google.com/calendar/event?eid=...
 >>>
+>>> # 複数のイベントをまとめて追加（50件ずつバッチリクエストで送信）
+>>> shifts = [
+...     {'summary': '早番', 'description': '', 'start_datetime': datetime(2025, 5, 11, 9, 0), 'end_datetime': datetime(2025, 5, 11, 13, 0)},
+...     {'summary': '遅番', 'description': '', 'start_datetime': datetime(2025, 5, 11, 13, 0), 'end_datetime': datetime(2025, 5, 11, 18, 0)},
+... ]
+>>> results = client.add_events(shifts)
+イベントを追加しています... 2/2件
+イベントを2件作成しました。失敗: 0件
+>>>
 >>> # イベント一覧の取得と表示
 >>> events = client.list_events()
 直近10件のイベントを取得します...
 1. 2025-05-10T10:00:00+09:00 - 新しい予定 (ID: ka44cbcqdrr2lnp20l48o4r3o8)
 >>>
+>>> # 期間を指定してイベントを1件ずつ取得（1ページずつ取得し、指定した項目だけを受信）
+>>> for event in client.iter_events(datetime(2025, 5, 1), datetime(2025, 6, 1), fields=['id', 'summary', 'start']):
+...     print(event['start'].get('dateTime'), event.get('summary'))
+2025-05-10T10:00:00+09:00 新しい予定
+>>>
 >>> # イベントの削除
 >>> client.delete_event("ka44cbcqdrr2lnp20l48o4r3o8")
 イベント (ID: ka44cbcqdrr2lnp20l48o4r3o8) を削除しています...
 イベントを削除しました。
 True
+>>>
+>>> # 期間のイベントをまとめて削除（50件ずつのバッチリクエストを並行して送信）
+>>> results = client.purge_range(datetime(2025, 5, 11), datetime(2025, 5, 12))
+削除対象のイベントを検索しています...
+削除対象: 2件
+イベントを削除しています... 2/2件
+イベントを2件削除しました。失敗: 0件
 
 前提条件:
 1. credentials.json ファイルが配置されていること
 2. .env ファイルに GOOGLE_CALENDAR_ID が設定されていること
 """
 import datetime
+import itertools
 import os
+import uuid
 from pathlib import Path
 
 from dotenv import load_dotenv
-from google.oauth2.service_account import Credentials
-from googleapiclient.discovery import build
+
+from gcp07_google_calendar.calendar_batch import BATCH_SIZE, execute_batched
+from gcp07_google_calendar.calendar_service import READONLY_SCOPES, SCOPES, get_calendar_service
+from shared.instrumentation import execute_request
+
+# iter_events で1回のリクエストで取得するイベント数（API の上限は2500件）
+PAGE_SIZE = 1000
+
+# delete_events で並行して送信するバッチリクエストの数
+DELETE_WORKERS = 4
+
+# 削除済みのイベントに対する削除リクエストのステータス（削除に成功したものとして扱う）
+ALREADY_DELETED_STATUSES = {404, 410}
+
+
+def to_rfc3339(value):
+    """日時を API に渡す RFC3339 形式の文字列に変換
+
+    :param value: datetime.datetime または RFC3339 形式の文字列。タイムゾーンのない datetime はローカル時刻とみなします
+    :return: RFC3339 形式の文字列
+    """
+    if isinstance(value, str):
+        return value
+    if value.tzinfo is None:
+        value = value.astimezone()
+    return value.isoformat()
+
+
+def parse_event_time(value):
+    """イベントの start / end の辞書を datetime に変換
+
+    終日のイベント ({'date': '2025-05-10'}) は、その日のローカル時刻の0時とみなします。
+
+    :param value: イベントの 'start' または 'end' の辞書
+    :return: タイムゾーン付きの datetime.datetime
+    """
+    if 'dateTime' in value:
+        # Python 3.10 以前の fromisoformat は末尾の 'Z' を解釈できない
+        return datetime.datetime.fromisoformat(value['dateTime'].replace('Z', '+00:00'))
+    return datetime.datetime.fromisoformat(value['date']).astimezone()
 
 
 class GoogleCalendarClient:
@@ -57,23 +118,37 @@ class GoogleCalendarClient:
     def _get_service(self, readonly=False):
         """Google Calendar API サービスを取得
 
+        スコープごとに作成済みのサービスを使い回すため、認証情報の読み込みと
+        サービスの作成は最初の呼び出し時だけ行われます。
+
         :param readonly: 読み取り専用モードかどうか (True/False)
         :return: サービスオブジェクト。エラー発生時はNone
         """
         # スコープの設定（読み取り専用かどうかで切り替え）
-        if readonly:
-            scopes = ['https://www.googleapis.com/auth/calendar.readonly']
-        else:
-            scopes = ['https://www.googleapis.com/auth/calendar']
+        scopes = READONLY_SCOPES if readonly else SCOPES
 
         try:
-            creds = Credentials.from_service_account_file(self.credentials_file, scopes=scopes)
-            service = build('calendar', 'v3', credentials=creds, cache_discovery=False)
-            return service
+            return get_calendar_service(scopes, self.credentials_file)
         except Exception as e:
             print(f"Google Calendar APIへの接続中にエラーが発生しました: {e}")
             return None
 
+    @staticmethod
+    def _build_event(summary, description, start_datetime, end_datetime, timezone='Asia/Tokyo'):
+        """API に送信するイベントの本文を作成"""
+        return {
+            'summary': summary,
+            'description': description,
+            'start': {
+                'dateTime': start_datetime.isoformat(),
+                'timeZone': timezone,
+            },
+            'end': {
+                'dateTime': end_datetime.isoformat(),
+                'timeZone': timezone,
+            },
+        }
+
     def add_event(self, summary, description, start_datetime, end_datetime, timezone='Asia/Tokyo'):
         """イベントを追加
 
@@ -92,27 +167,76 @@ class GoogleCalendarClient:
         if not service:
             return None
 
-        event = {
-            'summary': summary,
-            'description': description,
-            'start': {
-                'dateTime': start_datetime.isoformat(),
-                'timeZone': timezone,
-            },
-            'end': {
-                'dateTime': end_datetime.isoformat(),
-                'timeZone': timezone,
-            },
-        }
+        event = self._build_event(summary, description, start_datetime, end_datetime, timezone)
 
         try:
-            created_event = service.events().insert(calendarId=self.calendar_id, body=event).execute()
+            created_event = execute_request(service.events().insert(calendarId=self.calendar_id, body=event), 'calendar')
             print(f"イベントを作成しました: {created_event.get('htmlLink')}")
             return created_event
         except Exception as e:
             print(f"イベントの作成中にエラーが発生しました: {e}")
             return None
 
+    def add_events(self, events, batch_size=BATCH_SIZE):
+        """複数のイベントをまとめて追加
+
+        最大50件の追加リクエストを1回の HTTP 通信（バッチリクエスト）で送信します。
+        レート制限や一時的なエラーで失敗したイベントだけを、待ち時間をおいて再送信します。
+        再送信で同じイベントが重複して作成されないよう、イベントIDはクライアント側で割り当てます。
+
+        :param events: イベントの iterable。各要素は add_event と同じ引数名の辞書
+                       （summary, description, start_datetime, end_datetime, 省略可能な timezone）
+        :param batch_size: 1回のバッチリクエストにまとめる件数（最大50）
+        :return: 入力と同じ順序の結果のリスト。各要素は {'event': 作成されたイベント, 'error': エラーメッセージ}
+                 で、成功した場合の error と失敗した場合の event は None。
+                 カレンダーIDが未設定の場合や接続に失敗した場合はNone
+        """
+        if not self.calendar_id:
+            print("エラー: カレンダーIDが設定されていません。")
+            return None
+
+        service = self._get_service()
+        if not service:
+            return None
+
+        bodies = []
+        for event in events:
+            body = self._build_event(**event)
+            # base32hex（0-9, a-v）の範囲の文字で、重複しないIDを割り当てる
+            body['id'] = uuid.uuid4().hex
+            bodies.append(body)
+
+        def make_request(body):
+            return lambda service: service.events().insert(calendarId=self.calendar_id, body=body)
+
+        def make_get_request(event_id):
+            return lambda service: service.events().get(calendarId=self.calendar_id, eventId=event_id)
+
+        def print_progress(done, total):
+            print(f"イベントを追加しています... {done}/{total}件")
+
+        requests = {str(i): make_request(body) for i, body in enumerate(bodies)}
+        outcome = execute_batched(service, requests, batch_size=batch_size, on_progress=print_progress)
+
+        # 再送信前のリクエストで作成済みだった場合（同じIDのイベントが既に存在する）は、
+        # 他の結果と同じ形式になるよう、保存されたイベントを取得し直す
+        conflicts = {
+            key: make_get_request(bodies[int(key)]['id'])
+            for key, (_, error) in outcome.items()
+            if error is not None and getattr(getattr(error, 'resp', None), 'status', None) == 409
+        }
+        if conflicts:
+            outcome.update(execute_batched(service, conflicts, batch_size=batch_size))
+
+        results = []
+        for i in range(len(bodies)):
+            created_event, error = outcome[str(i)]
+            results.append({'event': created_event, 'error': None if error is None else str(error)})
+
+        failed = sum(result['error'] is not None for result in results)
+        print(f"イベントを{len(results) - failed}件作成しました。失敗: {failed}件")
+        return results
+
     def list_events(self, max_results=10):
         """イベント一覧を取得・表示
 
@@ -123,24 +247,19 @@ class GoogleCalendarClient:
             print("エラー: カレンダーIDが設定されていません。")
             return None
 
-        service = self._get_service(readonly=True)
-        if not service:
+        # 接続に失敗した場合は、イベントがない場合と区別して None を返す
+        if not self._get_service(readonly=True):
             return None
 
-        # 現在時刻の取得 (ISO形式)
-        now = datetime.datetime.now(datetime.timezone.utc).isoformat()
+        # 現在時刻の取得
+        now = datetime.datetime.now(datetime.timezone.utc)
 
         try:
             print(f'直近{max_results}件のイベントを取得します...')
-            events_result = service.events().list(
-                calendarId=self.calendar_id,
-                timeMin=now,
-                maxResults=max_results,
-                singleEvents=True,
-                orderBy='startTime'
-            ).execute()
-
-            events = events_result.get('items', [])
+            events = list(itertools.islice(
+                self.iter_events(time_min=now, page_size=min(max_results, PAGE_SIZE), orderBy='startTime'),
+                max_results
+            ))
 
             if not events:
                 print('イベントは見つかりませんでした。')
@@ -155,6 +274,60 @@ class GoogleCalendarClient:
             print(f"イベントの取得中にエラーが発生しました: {e}")
             return None
 
+    def iter_events(self, time_min=None, time_max=None, fields=None, page_size=PAGE_SIZE, **params):
+        """指定した期間のイベントを1ページずつ取得し、1件ずつ返すジェネレーター
+
+        nextPageToken を使って最後のページまで順に取得します。
+        メモリ上に保持するのは取得中の1ページ分だけなので、件数の多い期間でもメモリ使用量は一定です。
+
+        :param time_min: 期間の開始日時 (datetime.datetime または RFC3339 形式の文字列)。省略時は制限なし
+        :param time_max: 期間の終了日時 (datetime.datetime または RFC3339 形式の文字列)。省略時は制限なし
+        :param fields: 取得するイベントの項目のリスト（例: ['id', 'summary', 'start', 'end']）。
+                       指定した項目だけを受信するため、通信量を減らせます。省略時は全ての項目
+        :param page_size: 1回のリクエストで取得するイベント数（最大2500）
+        :param params: events().list に渡すその他の引数（q, orderBy, showDeleted など）
+        :return: イベントの辞書を1件ずつ返すジェネレーター。カレンダーIDが未設定の場合や接続に失敗した場合は何も返しません
+        :raises googleapiclient.errors.HttpError: イベントの取得に失敗した場合
+        """
+        request_params = {
+            'maxResults': page_size,
+            'singleEvents': True,
+            **params,
+        }
+        if time_min is not None:
+            request_params['timeMin'] = to_rfc3339(time_min)
+        if time_max is not None:
+            request_params['timeMax'] = to_rfc3339(time_max)
+        if fields is not None:
+            # 次のページの取得に必要な nextPageToken は常に受信する
+            request_params['fields'] = f"nextPageToken,items({','.join(fields)})"
+
+        for page in self.iter_pages(**request_params):
+            yield from page.get('items', [])
+
+    def iter_pages(self, **params):
+        """events().list の応答を1ページずつ返すジェネレーター
+
+        イベント以外の項目（最後のページの nextSyncToken など）が必要な場合に使用します。
+
+        :param params: events().list に渡す引数（calendarId はこのクライアントのカレンダーID）
+        :return: 応答の辞書を1ページずつ返すジェネレーター。カレンダーIDが未設定の場合や接続に失敗した場合は何も返しません
+        :raises googleapiclient.errors.HttpError: イベントの取得に失敗した場合
+        """
+        if not self.calendar_id:
+            print("エラー: カレンダーIDが設定されていません。")
+            return
+
+        service = self._get_service(readonly=True)
+        if not service:
+            return
+
+        request = service.events().list(calendarId=self.calendar_id, **params)
+        while request is not None:
+            response = execute_request(request, 'calendar')
+            yield response
+            request = service.events().list_next(request, response)
+
     def delete_event(self, event_id):
         """イベントを削除
 
@@ -171,13 +344,103 @@ class GoogleCalendarClient:
 
         try:
             print(f"イベント (ID: {event_id}) を削除しています...")
-            service.events().delete(calendarId=self.calendar_id, eventId=event_id).execute()
+            execute_request(service.events().delete(calendarId=self.calendar_id, eventId=event_id), 'calendar')
             print(f"イベントを削除しました。")
             return True
         except Exception as e:
             print(f"イベントの削除中にエラーが発生しました: {e}")
             return False
 
+    def delete_events(self, event_ids, batch_size=BATCH_SIZE, max_workers=DELETE_WORKERS):
+        """複数のイベントをまとめて削除
+
+        最大50件の削除リクエストを1回の HTTP 通信（バッチリクエスト）で送信し、
+        max_workers 件のバッチリクエストを並行して送信します。
+        レート制限や一時的なエラーで失敗したイベントだけを、待ち時間をおいて再送信します。
+        既に削除されているイベント（404 / 410）は、削除に成功したものとして扱います。
+
+        :param event_ids: 削除するイベントのIDの iterable
+        :param batch_size: 1回のバッチリクエストにまとめる件数（最大50）
+        :param max_workers: 並行して送信するバッチリクエストの数
+        :return: 入力と同じ順序の結果のリスト（重複したIDは1件にまとめます）。各要素は {'id': イベントID, 'error': エラーメッセージ}
+                 で、成功した場合の error は None。カレンダーIDが未設定の場合や接続に失敗した場合はNone
+        """
+        if not self.calendar_id:
+            print("エラー: カレンダーIDが設定されていません。")
+            return None
+
+        service = self._get_service()
+        if not service:
+            return None
+
+        event_ids = list(dict.fromkeys(event_ids))
+
+        def make_request(event_id):
+            return lambda service: service.events().delete(calendarId=self.calendar_id, eventId=event_id)
+
+        def print_progress(done, total):
+            print(f"イベントを削除しています... {done}/{total}件")
+
+        requests = {event_id: make_request(event_id) for event_id in event_ids}
+        outcome = execute_batched(
+            service, requests, batch_size=batch_size, on_progress=print_progress, max_workers=max_workers,
+            service_factory=lambda: get_calendar_service(SCOPES, self.credentials_file),
+        )
+
+        results = []
+        for event_id in event_ids:
+            _, error = outcome[event_id]
+            if error is not None and getattr(getattr(error, 'resp', None), 'status', None) in ALREADY_DELETED_STATUSES:
+                # 再送信前のリクエストや別の操作で削除済みだった場合
+                error = None
+            results.append({'id': event_id, 'error': None if error is None else str(error)})
+
+        failed = sum(result['error'] is not None for result in results)
+        print(f"イベントを{len(results) - failed}件削除しました。失敗: {failed}件")
+        return results
+
+    def purge_range(self, start, end, predicate=None, batch_size=BATCH_SIZE, max_workers=DELETE_WORKERS):
+        """指定した期間のイベントをまとめて削除
+
+        iter_events で期間のイベントを1ページずつ取得して削除対象のIDを集め、delete_events でまとめて削除します。
+        取得中のページが削除で変わらないよう、削除は全てのページを取得した後に行います。
+        繰り返しのイベントは、期間内の回だけを削除します。
+
+        :param start: 期間の開始日時 (datetime.datetime または RFC3339 形式の文字列)
+        :param end: 期間の終了日時 (datetime.datetime または RFC3339 形式の文字列)
+        :param predicate: イベントの辞書を受け取り、削除する場合に True を返す関数。省略時は期間の全てのイベントを削除
+        :param batch_size: 1回のバッチリクエストにまとめる件数（最大50）
+        :param max_workers: 並行して送信するバッチリクエストの数
+        :return: delete_events の結果。削除対象がない場合は空のリスト。
+                 カレンダーIDが未設定の場合や、接続・イベントの取得に失敗した場合はNone
+        """
+        if not self.calendar_id:
+            print("エラー: カレンダーIDが設定されていません。")
+            return None
+
+        # 接続に失敗した場合は、削除対象がない場合と区別して None を返す
+        if not self._get_service(readonly=True):
+            return None
+
+        # 条件を指定しない場合は、削除に必要なIDだけを受信する
+        fields = None if predicate is not None else ['id']
+        try:
+            print("削除対象のイベントを検索しています...")
+            event_ids = [
+                event['id'] for event in self.iter_events(time_min=start, time_max=end, fields=fields)
+                if predicate is None or predicate(event)
+            ]
+        except Exception as e:
+            print(f"イベントの取得中にエラーが発生しました: {e}")
+            return None
+
+        if not event_ids:
+            print("削除対象となるイベントがありません。")
+            return []
+
+        print(f"削除対象: {len(event_ids)}件")
+        return self.delete_events(event_ids, batch_size=batch_size, max_workers=max_workers)
+
     def delete_first_event(self):
         """最初のイベントを削除する便利メソッド
 
@@ -0,0 +1,129 @@
+"""EventIndex による検索と、イベント一覧を先頭から調べる検索の処理速度を比較するベンチマーク
+
+ランダムに作成した複数のカレンダーのイベントに対して、以下の問い合わせを繰り返し実行します：
+- 指定した時間帯と重なるイベントの検索
+- 指定した時間帯が空いているかどうかの判定
+- 全てのカレンダーで共通の空き時間の検索
+
+Google Calendar API は呼び出さないため、認証情報なしで実行できます。
+2つの方式の検索結果が一致することも確認します。
+"""
+import datetime
+import random
+import sys
+import time
+from pathlib import Path
+
+# リポジトリ直下のパッケージを読み込めるようにする
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from gcp07_google_calendar.calendar_index import EventIndex, find_free_slots
+from gcp07_google_calendar.gc05_calendar_class import parse_event_time
+
+# ベンチマークの設定
+CALENDAR_COUNT = 20  # カレンダーの数
+EVENTS_PER_CALENDAR = 5000  # カレンダーごとのイベント数
+QUERY_COUNT = 2000  # 重なりの検索と空き状況の判定の回数
+FREE_SLOT_QUERY_COUNT = 200  # 空き時間の検索の回数
+PERIOD_DAYS = 365  # イベントを作成する期間（日）
+SEED = 0
+
+TZ = datetime.timezone(datetime.timedelta(hours=9))
+PERIOD_START = datetime.datetime(2025, 1, 1, tzinfo=TZ)
+
+
+def make_events(rng, calendar_no):
+    """ランダムな開始日時と長さ（15分〜3時間、ときどき終日）のイベントを作成する"""
+    events = []
+    for i in range(EVENTS_PER_CALENDAR):
+        start = PERIOD_START + datetime.timedelta(minutes=rng.randrange(PERIOD_DAYS * 24 * 4) * 15)
+        if rng.random() < 0.02:
+            start_value = {'date': start.date().isoformat()}
+            end_value = {'date': (start.date() + datetime.timedelta(days=1)).isoformat()}
+        else:
+            end = start + datetime.timedelta(minutes=rng.randrange(1, 13) * 15)
+            start_value = {'dateTime': start.isoformat()}
+            end_value = {'dateTime': end.isoformat()}
+        events.append({'id': f'c{calendar_no}e{i}', 'start': start_value, 'end': end_value})
+    return events
+
+
+def random_window(rng, hours):
+    start = PERIOD_START + datetime.timedelta(minutes=rng.randrange(PERIOD_DAYS * 24 * 4) * 15)
+    return start, start + datetime.timedelta(hours=hours)
+
+
+class LinearScan:
+    """イベント一覧を先頭から調べる検索（比較用）
+
+    日時の変換の時間を含めないよう、開始・終了日時は EventIndex と同じく作成時に UNIX 時刻に変換しておきます。
+    """
+
+    def __init__(self, events):
+        entries = sorted((
+            (parse_event_time(event['start']).timestamp(), parse_event_time(event['end']).timestamp(), event)
+            for event in events
+        ), key=lambda entry: entry[0])
+        self.periods = [(start, end) for start, end, _ in entries]
+        self.events = [event for _, _, event in entries]
+
+    def overlapping(self, start, end):
+        start, end = start.timestamp(), end.timestamp()
+        return [event for event, (s, e) in zip(self.events, self.periods) if s < end and e > start]
+
+    def is_free(self, start, end):
+        start, end = start.timestamp(), end.timestamp()
+        return not any(s < end and e > start for s, e in self.periods)
+
+    def busy_periods(self, start, end):
+        start, end = start.timestamp(), end.timestamp()
+        return [(s, e) for s, e in self.periods if s < end and e > start]
+
+
+def run(label, func, queries):
+    """queries の各引数で func を実行して1回あたりの処理時間を表示し、結果のリストと合計の処理時間（秒）を返す"""
+    started = time.perf_counter()
+    results = [func(*query) for query in queries]
+    elapsed = time.perf_counter() - started
+    print(f"  {label:<24} {elapsed / len(queries) * 1e6:10.1f} µs/回 ({len(queries) / elapsed:10,.0f} 回/秒)")
+    return results, elapsed
+
+
+def main():
+    rng = random.Random(SEED)
+    print("カレンダー検索ベンチマーク")
+    print(f"カレンダー {CALENDAR_COUNT}件 x イベント {EVENTS_PER_CALENDAR}件, 問い合わせ {QUERY_COUNT}回")
+
+    calendars = [make_events(rng, i) for i in range(CALENDAR_COUNT)]
+
+    started = time.perf_counter()
+    indexes = [EventIndex(events) for events in calendars]
+    print(f"インデックスの作成: {time.perf_counter() - started:.2f}秒")
+    scans = [LinearScan(events) for events in calendars]
+
+    queries = []
+    for _ in range(QUERY_COUNT):
+        calendar_no = rng.randrange(CALENDAR_COUNT)
+        queries.append((calendar_no, *random_window(rng, rng.choice([0.5, 1, 2]))))
+    slot_queries = [(*random_window(rng, 10), datetime.timedelta(minutes=30)) for _ in range(FREE_SLOT_QUERY_COUNT)]
+
+    print("\n重なるイベントの検索")
+    index_result, index_time = run('EventIndex', lambda n, s, e: indexes[n].overlapping(s, e), queries)
+    scan_result, scan_time = run('先頭から検索', lambda n, s, e: scans[n].overlapping(s, e), queries)
+    assert index_result == scan_result, '検索結果が一致しません'
+    print(f"  速度比: {scan_time / index_time:.1f}倍")
+
+    print("\n空き状況の判定")
+    index_result, index_time = run('EventIndex', lambda n, s, e: indexes[n].is_free(s, e), queries)
+    scan_result, scan_time = run('先頭から検索', lambda n, s, e: scans[n].is_free(s, e), queries)
+    assert index_result == scan_result, '判定結果が一致しません'
+    print(f"  速度比: {scan_time / index_time:.1f}倍")
+
+    print(f"\n{CALENDAR_COUNT}件のカレンダーで共通の空き時間（30分以上）の検索")
+    index_result, index_time = run('EventIndex', lambda s, e, d: find_free_slots(indexes, s, e, d), slot_queries)
+    scan_result, scan_time = run('先頭から検索', lambda s, e, d: find_free_slots(scans, s, e, d), slot_queries)
+    assert index_result == scan_result, '検索結果が一致しません'
+    print(f"  速度比: {scan_time / index_time:.1f}倍")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,178 @@
+"""
+REST API を呼び出すサンプルで共通に使用する HTTP クライアント
+
+このモジュールは以下の機能を提供します：
+- keep-alive を有効にしたコネクションプール（同じホストへの接続を使い回し、TCP/TLS の接続処理を省略）
+- 応答の gzip 圧縮（Accept-Encoding と User-Agent で要求し、受信後に自動で展開）
+- リクエスト本文の gzip 圧縮（圧縮した本文を受け付ける API 向け、既定では無効）
+- 接続・読み込みのタイムアウト
+- 429 や 5xx、接続エラーの際の、ランダムなばらつきを加えた待ち時間での再試行
+- shared/instrumentation.py による所要時間・送受信バイト数・ステータス・リトライ回数の記録
+
+requests.post を直接呼び出すと、呼び出しのたびに新しい接続を作成するため、
+翻訳のような短いリクエストでは接続処理の時間が待ち時間の大きな割合を占めます。
+同じ HttpClient（または default_client()）を使い回すことで、2回目以降のリクエストは既存の接続で送信されます。
+
+requests は HTTP/2 に対応していないため、通信は HTTP/1.1 の keep-alive で行います。
+
+使用例：
+    response = default_client().post(url, params=params, api="translate", operation="translate/v2")
+    response.raise_for_status()
+"""
+
+import gzip
+import json
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from shared.instrumentation import instrument, url_operation
+
+# 接続と読み込みのタイムアウト（秒）
+DEFAULT_TIMEOUT = (10, 120)
+
+# 1つのホストに対して保持する接続数の上限
+POOL_SIZE = 10
+
+# 再試行の回数と、最初の再試行までの待ち時間の基準（秒）
+MAX_RETRIES = 3
+BASE_DELAY = 1.0
+
+# 再試行の待ち時間の上限（秒）
+MAX_DELAY = 30.0
+
+# 再試行するHTTPステータス
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# リクエスト本文を圧縮する場合の、圧縮する本文の最小サイズ（バイト）
+COMPRESS_MIN_BYTES = 1024
+
+# Google の API は、User-Agent に "gzip" を含めると gzip 圧縮した応答を返します
+USER_AGENT = "gcp-samples (gzip)"
+
+
+class HttpClient:
+    """コネクションプール・タイムアウト・再試行を備えた HTTP クライアント
+
+    複数のスレッドから同時に使用できます。
+
+    :param pool_size: 1つのホストに対して保持する接続数の上限（同時実行数に合わせる）
+    :param timeout: 接続と読み込みのタイムアウト（秒）。(接続, 読み込み) のタプルも指定可能
+    :param max_retries: 再試行の回数
+    :param base_delay: 最初の再試行までの待ち時間の基準（秒）。再試行のたびに2倍になります
+    :param compress_requests: リクエスト本文を gzip 圧縮して送信するかどうか
+    """
+
+    def __init__(
+        self,
+        pool_size=POOL_SIZE,
+        timeout=DEFAULT_TIMEOUT,
+        max_retries=MAX_RETRIES,
+        base_delay=BASE_DELAY,
+        compress_requests=False,
+    ):
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.compress_requests = compress_requests
+
+        self.session = requests.Session()
+        self.session.headers.update({"Accept-Encoding": "gzip", "User-Agent": USER_AGENT})
+        adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def close(self):
+        """保持している接続を閉じる"""
+        self.session.close()
+
+    def _compress(self, kwargs):
+        """本文が圧縮の対象であれば、gzip 圧縮した本文と Content-Encoding ヘッダーに置き換える"""
+        if "json" in kwargs and kwargs["json"] is not None:
+            kwargs["data"] = json.dumps(kwargs.pop("json")).encode("utf-8")
+            kwargs["headers"] = {"Content-Type": "application/json", **(kwargs.get("headers") or {})}
+
+        data = kwargs.get("data")
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        # ストリーミング送信用の本文やフォームの辞書は圧縮しない
+        if not isinstance(data, bytes) or len(data) < COMPRESS_MIN_BYTES:
+            return
+        kwargs["data"] = gzip.compress(data, compresslevel=5)
+        kwargs["headers"] = {**(kwargs.get("headers") or {}), "Content-Encoding": "gzip"}
+
+    def _retry_delay(self, attempt, response=None):
+        """再試行までの待ち時間を返す（Retry-After ヘッダーがあればそれに従う）"""
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), MAX_DELAY)
+        # 同時に失敗したリクエストが一斉に再送信しないよう、待ち時間をばらつかせる
+        return random.uniform(0, min(self.base_delay * 2**attempt, MAX_DELAY))
+
+    def request(self, method, url, api="http", operation=None, **kwargs):
+        """リクエストを送信し、requests.Response を返す
+
+        429 や 5xx の応答と接続エラー・タイムアウトの場合は、max_retries 回まで再試行します。
+        再試行しても成功しなかった応答はそのまま返すため、呼び出し側で raise_for_status() を呼び出してください。
+
+        :param method: HTTPメソッド（"GET", "POST" など）
+        :param url: 送信先の URL
+        :param api: 計測結果に記録する API の名前
+        :param operation: 計測結果に記録する操作の名前（省略時は HTTPメソッドと URL のパス）
+        :param kwargs: requests.Session.request に渡す引数（params, data, json, headers など）
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        if self.compress_requests:
+            self._compress(kwargs)
+
+        with instrument(api, operation or url_operation(method, url)) as call:
+            for attempt in range(self.max_retries + 1):
+                try:
+                    response = self.session.request(method, url, **kwargs)
+                except (requests.ConnectionError, requests.Timeout) as e:
+                    if attempt == self.max_retries:
+                        raise
+                    delay = self._retry_delay(attempt)
+                    print(f"警告: 通信エラーのため {delay:.1f}秒後に再試行します: {e}")
+                else:
+                    if response.status_code not in RETRY_STATUSES or attempt == self.max_retries:
+                        call.record_response(response)
+                        return response
+                    delay = self._retry_delay(attempt, response)
+                    print(f"警告: ステータス {response.status_code} のため {delay:.1f}秒後に再試行します")
+                    response.close()
+
+                call.add_retry()
+                time.sleep(delay)
+
+    def get(self, url, **kwargs):
+        """GET リクエストを送信する"""
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        """POST リクエストを送信する"""
+        return self.request("POST", url, **kwargs)
+
+
+_default_client = None
+_default_client_lock = threading.Lock()
+
+
+def default_client():
+    """プロセス内で共有する HttpClient を返す関数（初回の呼び出し時に作成）"""
+    global _default_client
+    if _default_client is None:
+        with _default_client_lock:
+            if _default_client is None:
+                _default_client = HttpClient()
+    return _default_client
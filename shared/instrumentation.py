@@ -0,0 +1,436 @@
+"""
+外部APIの呼び出しを計測するモジュール
+
+このモジュールは以下の機能を提供します：
+- API呼び出しごとの所要時間・送受信バイト数・ステータス・リトライ回数の記録
+  （コンテキストマネージャー instrument とデコレーター instrumented）
+- 記録した内容の出力先（JSON Lines 形式のファイル、Prometheus のテキスト形式のファイル）
+- requests / googleapiclient / boto3 の応答からステータスとバイト数を取り出す処理
+
+環境変数 API_METRICS_DIR にディレクトリを指定すると、そのディレクトリに以下のファイルを出力します：
+- api_calls.jsonl: 1回の呼び出しにつき1行の記録（全てのスクリプトで共通のファイルに追記）
+- <スクリプト名>.prom: API・操作・ステータスごとの集計（node_exporter の textfile collector で読み込める形式）
+
+API_METRICS_DIR を指定しない場合は何も出力せず、計測の処理は時刻の取得程度に抑えられます。
+
+使用例：
+    with instrument("translate", "translate_text") as call:
+        response = requests.post(url, params=params)
+        call.record_response(response)
+"""
+
+import atexit
+import functools
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+
+# 計測結果の出力先ディレクトリ（未設定の場合は出力しない）
+METRICS_DIR = os.getenv("API_METRICS_DIR")
+
+# 所要時間のヒストグラムの区切り（秒）
+LATENCY_BUCKETS = [0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0]
+
+# URL のうち、操作の名前に含めない（呼び出しごとに変わる）部分
+_URL_ID_PATTERNS = [
+    (re.compile(r"^https?://[^/]+"), ""),
+    (re.compile(r"\?.*$"), ""),
+    (re.compile(r"/spreadsheets/[^/:]+"), "/spreadsheets/{id}"),
+    (re.compile(r"/values/[^/]+?(:append|:clear)?$"), r"/values/{range}\1"),
+    (re.compile(r"/files/[^/:]+"), "/files/{id}"),
+]
+
+
+def _body_size(body):
+    """リクエスト本文のバイト数を返す（不明な場合は None）"""
+    if body is None:
+        return 0
+    if isinstance(body, str):
+        return len(body.encode("utf-8"))
+    try:
+        # bytes のほか、__len__ を持つストリーミング送信用の本文にも対応する
+        return len(body)
+    except TypeError:
+        return None
+
+
+def _status_from_exception(exc):
+    """例外からHTTPステータス（取り出せない場合は例外のクラス名）を返す"""
+    # googleapiclient.errors.HttpError
+    resp = getattr(exc, "resp", None)
+    if resp is not None and getattr(resp, "status", None) is not None:
+        return int(resp.status)
+    # requests.HTTPError, gspread.exceptions.APIError, botocore.exceptions.ClientError
+    response = getattr(exc, "response", None)
+    if getattr(response, "status_code", None) is not None:
+        return response.status_code
+    if isinstance(response, dict):
+        status = response.get("ResponseMetadata", {}).get("HTTPStatusCode")
+        if status is not None:
+            return status
+    # google.api_core.exceptions.GoogleAPICallError
+    if isinstance(getattr(exc, "code", None), int):
+        return exc.code
+    return type(exc).__name__
+
+
+def _escape_label(value):
+    """Prometheus のラベル値に使えない文字をエスケープする"""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class ApiCall:
+    """1回のAPI呼び出しの計測結果（with 文で使用するコンテキストマネージャー）
+
+    with ブロックの所要時間を計測し、ブロックを抜けたときに出力先へ記録します。
+    ブロックの中で例外が発生した場合は、例外からステータスを取り出して記録します（例外はそのまま送出されます）。
+
+    :param api: API の名前（例: "vision", "translate", "calendar"）
+    :param operation: 操作の名前（例: "images:annotate", "calendar.events.insert"）
+    :param instrumentation: 記録先の Instrumentation
+    """
+
+    def __init__(self, api, operation, instrumentation):
+        self.api = api
+        self.operation = operation
+        self.status = None
+        self.bytes_sent = None
+        self.bytes_received = None
+        self.retries = 0
+        self.latency = None
+        self.timestamp = None
+        self._instrumentation = instrumentation
+        self._start = None
+
+    def __enter__(self):
+        self.timestamp = time.time()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.latency = time.perf_counter() - self._start
+        if exc is not None:
+            self.status = _status_from_exception(exc)
+        elif self.status is None:
+            self.status = "ok"
+        self._instrumentation.export(self)
+        return False
+
+    def add_retry(self):
+        """リトライした回数を1増やす"""
+        self.retries += 1
+
+    def record_response(self, response):
+        """requests の応答からステータスと送受信バイト数を記録する"""
+        self.status = response.status_code
+        self.bytes_sent = _body_size(response.request.body)
+        # 圧縮された応答は、展開後ではなく転送時のサイズを記録する
+        length = response.headers.get("Content-Length")
+        self.bytes_received = int(length) if length is not None else len(response.content)
+
+    def record_boto3(self, response):
+        """boto3 の応答からステータス・受信バイト数・リトライ回数を記録する"""
+        metadata = response.get("ResponseMetadata", {})
+        self.status = metadata.get("HTTPStatusCode", self.status)
+        self.retries += metadata.get("RetryAttempts", 0)
+        length = metadata.get("HTTPHeaders", {}).get("content-length")
+        if length is not None:
+            self.bytes_received = int(length)
+
+    def to_dict(self):
+        """JSON に変換できる辞書を返す"""
+        return {
+            "timestamp": self.timestamp,
+            "api": self.api,
+            "operation": self.operation,
+            "status": self.status,
+            "latency": self.latency,
+            "bytes_sent": self.bytes_sent,
+            "bytes_received": self.bytes_received,
+            "retries": self.retries,
+        }
+
+
+class JsonLinesExporter:
+    """計測結果を1呼び出し1行のJSONとしてファイルに追記する出力先
+
+    :param path: 出力するファイルのパス
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._file = open(self.path, "a", encoding="utf-8")
+
+    def export(self, call):
+        line = json.dumps(call.to_dict(), ensure_ascii=False) + "\n"
+        with self._lock:
+            self._file.write(line)
+
+    def flush(self):
+        with self._lock:
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+class PrometheusTextExporter:
+    """計測結果を集計し、Prometheus のテキスト形式でファイルに書き出す出力先
+
+    集計は flush_interval 秒ごとと、終了時（flush の呼び出し時）にファイル全体を書き直します。
+    書き込み中のファイルが読み込まれないよう、一時ファイルに書き出してから置き換えます。
+
+    :param path: 出力するファイルのパス
+    :param flush_interval: ファイルを書き直す間隔（秒）
+    :param labels: 全ての系列に付けるラベル（例: {"script": "vision_02_read_all"}）
+    """
+
+    def __init__(self, path, flush_interval=10.0, labels=None):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.flush_interval = flush_interval
+        self.labels = labels or {}
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        self._calls = defaultdict(int)
+        self._latency_counts = defaultdict(lambda: [0] * len(LATENCY_BUCKETS))
+        self._latency_sum = defaultdict(float)
+        self._latency_count = defaultdict(int)
+        self._bytes_sent = defaultdict(int)
+        self._bytes_received = defaultdict(int)
+        self._retries = defaultdict(int)
+
+    def export(self, call):
+        key = (call.api, call.operation)
+        with self._lock:
+            self._calls[key + (str(call.status),)] += 1
+            counts = self._latency_counts[key]
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if call.latency <= bound:
+                    counts[i] += 1
+            self._latency_sum[key] += call.latency
+            self._latency_count[key] += 1
+            self._bytes_sent[key] += call.bytes_sent or 0
+            self._bytes_received[key] += call.bytes_received or 0
+            self._retries[key] += call.retries
+            due = time.monotonic() - self._last_flush >= self.flush_interval
+        if due:
+            self.flush()
+
+    def _format_labels(self, **labels):
+        pairs = {**self.labels, **labels}
+        return "{" + ",".join(f'{name}="{_escape_label(value)}"' for name, value in pairs.items()) + "}"
+
+    def render(self):
+        """集計結果を Prometheus のテキスト形式の文字列にする"""
+        lines = [
+            "# HELP api_calls_total API呼び出しの回数",
+            "# TYPE api_calls_total counter",
+        ]
+        for (api, operation, status), value in sorted(self._calls.items()):
+            lines.append(f"api_calls_total{self._format_labels(api=api, operation=operation, status=status)} {value}")
+
+        lines += [
+            "# HELP api_call_latency_seconds API呼び出しの所要時間（リトライを含む）",
+            "# TYPE api_call_latency_seconds histogram",
+        ]
+        for (api, operation), counts in sorted(self._latency_counts.items()):
+            for bound, count in zip(LATENCY_BUCKETS, counts):
+                labels = self._format_labels(api=api, operation=operation, le=bound)
+                lines.append(f"api_call_latency_seconds_bucket{labels} {count}")
+            labels = self._format_labels(api=api, operation=operation, le="+Inf")
+            lines.append(f"api_call_latency_seconds_bucket{labels} {self._latency_count[(api, operation)]}")
+            labels = self._format_labels(api=api, operation=operation)
+            lines.append(f"api_call_latency_seconds_sum{labels} {self._latency_sum[(api, operation)]}")
+            lines.append(f"api_call_latency_seconds_count{labels} {self._latency_count[(api, operation)]}")
+
+        for name, values, help_text in [
+            ("api_call_bytes_sent_total", self._bytes_sent, "送信したリクエスト本文のバイト数"),
+            ("api_call_bytes_received_total", self._bytes_received, "受信した応答本文のバイト数"),
+            ("api_call_retries_total", self._retries, "リトライした回数"),
+        ]:
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+            for (api, operation), value in sorted(values.items()):
+                lines.append(f"{name}{self._format_labels(api=api, operation=operation)} {value}")
+
+        return "\n".join(lines) + "\n"
+
+    def flush(self):
+        with self._lock:
+            text = self.render()
+            self._last_flush = time.monotonic()
+            temp_path = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+            temp_path.write_text(text, encoding="utf-8")
+            os.replace(temp_path, self.path)
+
+    def close(self):
+        self.flush()
+
+
+class Instrumentation:
+    """API呼び出しの計測結果を、登録された出力先に渡すクラス
+
+    :param exporters: 出力先のリスト（export, flush, close メソッドを持つオブジェクト）
+    """
+
+    def __init__(self, exporters=None):
+        self.exporters = list(exporters or [])
+
+    def add_exporter(self, exporter):
+        """出力先を追加する"""
+        self.exporters.append(exporter)
+        return exporter
+
+    def export(self, call):
+        """計測結果を全ての出力先に渡す（出力先のエラーで API 呼び出しを失敗させない）"""
+        for exporter in self.exporters:
+            try:
+                exporter.export(call)
+            except Exception as e:
+                print(f"警告: 計測結果の出力に失敗しました: {e}")
+
+    def flush(self):
+        """全ての出力先の内容をファイルに書き出す"""
+        for exporter in self.exporters:
+            exporter.flush()
+
+    def close(self):
+        """全ての出力先を閉じる"""
+        for exporter in self.exporters:
+            exporter.close()
+
+    def call(self, api, operation):
+        """API呼び出しを計測するコンテキストマネージャーを返す"""
+        return ApiCall(api, operation, self)
+
+
+def _create_default_instrumentation():
+    instrumentation = Instrumentation()
+    if METRICS_DIR:
+        script = Path(sys.argv[0]).stem or "python"
+        metrics_dir = Path(METRICS_DIR)
+        instrumentation.add_exporter(JsonLinesExporter(metrics_dir / "api_calls.jsonl"))
+        instrumentation.add_exporter(PrometheusTextExporter(metrics_dir / f"{script}.prom", labels={"script": script}))
+        atexit.register(instrumentation.close)
+    return instrumentation
+
+
+default_instrumentation = _create_default_instrumentation()
+
+
+def instrument(api, operation, instrumentation=None):
+    """API呼び出しを計測するコンテキストマネージャーを返す関数
+
+    :param api: API の名前
+    :param operation: 操作の名前
+    :param instrumentation: 記録先（省略時は API_METRICS_DIR の設定に従う既定の記録先）
+    """
+    return (instrumentation or default_instrumentation).call(api, operation)
+
+
+def instrumented(api, operation=None, instrumentation=None):
+    """関数の呼び出しを1回のAPI呼び出しとして計測するデコレーター
+
+    関数が requests の応答を返す場合は、ステータスと送受信バイト数も記録します。
+
+    :param api: API の名前
+    :param operation: 操作の名前（省略時は関数名）
+    """
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with instrument(api, operation or func.__name__, instrumentation) as call:
+                result = func(*args, **kwargs)
+                if hasattr(result, "status_code") and hasattr(result, "request"):
+                    call.record_response(result)
+                return result
+
+        return wrapper
+
+    return decorator
+
+
+def execute_request(request, api, num_retries=0, instrumentation=None):
+    """googleapiclient のリクエストを実行し、計測結果を記録する関数
+
+    操作の名前には、リクエストのメソッドID（例: "calendar.events.insert"）を使用します。
+
+    :param request: googleapiclient の HttpRequest（service.events().insert(...) など）
+    :param api: API の名前
+    :param num_retries: googleapiclient に任せるリトライの回数
+    :return: request.execute() の戻り値
+    """
+    with instrument(api, request.methodId, instrumentation) as call:
+        call.bytes_sent = _body_size(request.body)
+        return request.execute(num_retries=num_retries)
+
+
+def url_operation(method, url):
+    """URL から、スプレッドシートIDなどを除いた操作の名前を作る"""
+    for pattern, replacement in _URL_ID_PATTERNS:
+        url = pattern.sub(replacement, url)
+    return f"{method.upper()} {url}"
+
+
+def instrument_gspread(client, api="sheets", instrumentation=None):
+    """gspread の Client が送信する全てのリクエストを計測するようにする関数
+
+    操作の名前は、HTTPメソッドと URL のパス（スプレッドシートIDなどは {id} に置き換え）です。
+
+    :param client: gspread.authorize() などで作成した gspread.Client
+    :return: 引数の client
+    """
+    http_client = client.http_client
+    original_request = http_client.request
+
+    def request(method, endpoint, *args, **kwargs):
+        with instrument(api, url_operation(method, endpoint), instrumentation) as call:
+            response = original_request(method, endpoint, *args, **kwargs)
+            call.record_response(response)
+            return response
+
+    http_client.request = request
+    return client
+
+
+def instrument_boto3(client, instrumentation=None):
+    """boto3 のクライアントが送信する全てのリクエストを計測するようにする関数
+
+    botocore のイベント（before-call, after-call, after-call-error）に処理を登録するため、
+    呼び出し側のコードを変更せずに、全ての操作の所要時間・ステータス・リトライ回数を記録できます。
+    API の名前は "aws.<サービス名>"（例: "aws.rekognition"）、操作の名前は操作名（例: "DetectLabels"）です。
+
+    :param client: boto3.client() で作成したクライアント
+    :return: 引数の client
+    """
+    api = f"aws.{client.meta.service_model.service_name}"
+
+    def before_call(model, params, context, **kwargs):
+        call = instrument(api, model.name, instrumentation).__enter__()
+        call.bytes_sent = _body_size(params.get("body"))
+        context["api_call"] = call
+
+    def after_call(parsed, context, **kwargs):
+        call = context.pop("api_call", None)
+        if call is not None:
+            call.record_boto3(parsed)
+            call.__exit__(None, None, None)
+
+    def after_call_error(exception, context, **kwargs):
+        call = context.pop("api_call", None)
+        if call is not None:
+            call.__exit__(type(exception), exception, None)
+
+    client.meta.events.register("before-call", before_call)
+    client.meta.events.register("after-call", after_call)
+    client.meta.events.register("after-call-error", after_call_error)
+    return client